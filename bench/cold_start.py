@@ -0,0 +1,135 @@
+"""Démarrage à froid de gunicorn : avec et sans PRELOAD_APP
+
+Usage : python bench/cold_start.py [--workers 2] [--output cold_start.json]
+
+Pour chaque mode, lance gunicorn avec gunicorn_config.py, mesure le temps
+jusqu'à la première extraction réussie (sur un faux MP4 local) et la
+mémoire de chaque worker : RSS, et PSS qui compte les pages partagées
+au prorata des processus qui les partagent.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_site import start_server
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def memory_kb(pid):
+    """RSS et PSS d'un processus, en Ko (Linux)"""
+    values = {}
+    for name, field in (("status", "VmRSS"), ("smaps_rollup", "Pss")):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        values[field] = int(line.split()[1])
+        except OSError:
+            pass
+    return {"rss_kb": values.get("VmRSS"), "pss_kb": values.get("Pss")}
+
+def worker_pids(master):
+    try:
+        with open(f"/proc/{master}/task/{master}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+def run_mode(preload, workers, video_url, timeout=120):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        PRELOAD_APP="1" if preload else "0",
+        CACHE_DB_PATH="",
+    )
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "-c", "gunicorn_config.py",
+        "--workers", str(workers),
+        "--log-level", "warning",
+        "server:app",
+    ]
+    started = time.time()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    first_extract = None
+    try:
+        while time.time() - started < timeout:
+            try:
+                response = httpx.get(
+                    f"http://127.0.0.1:{port}/api/extract",
+                    params={"url": video_url},
+                    timeout=30,
+                )
+                if response.status_code == 200 and response.json().get("success"):
+                    first_extract = time.time() - started
+                    break
+            except (httpx.HTTPError, ValueError):
+                pass
+            time.sleep(0.05)
+
+        # Laisser chaque worker servir une extraction avant de mesurer sa mémoire
+        for i in range(workers * 4):
+            try:
+                httpx.get(
+                    f"http://127.0.0.1:{port}/api/extract",
+                    params={"url": f"{video_url}?n={i}"},
+                    timeout=30,
+                )
+            except httpx.HTTPError:
+                pass
+
+        pids = worker_pids(process.pid)
+        return {
+            "preload": preload,
+            "time_to_first_extract_s": round(first_extract, 3) if first_extract else None,
+            "master": memory_kb(process.pid),
+            "workers": [memory_kb(pid) for pid in pids],
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    server, base = start_server()
+    results = [run_mode(preload, args.workers, f"{base}/video.mp4") for preload in (False, True)]
+    server.shutdown()
+
+    for result in results:
+        workers = result["workers"]
+        rss = sum(w["rss_kb"] or 0 for w in workers) / max(len(workers), 1) / 1024
+        pss = sum(w["pss_kb"] or 0 for w in workers) / max(len(workers), 1) / 1024
+        print(
+            f"preload={str(result['preload']):<5} "
+            f"first_extract={result['time_to_first_extract_s']}s "
+            f"worker_rss={rss:.1f}MB worker_pss={pss:.1f}MB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
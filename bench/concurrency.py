@@ -0,0 +1,174 @@
+"""Capacité en connexions simultanées : SERVER_MODE=sync contre SERVER_MODE=threads
+
+Usage : python bench/concurrency.py [--clients 200] [--delay 1] [--workers 2] [--output concurrency.json]
+
+Pour chaque mode, lance gunicorn avec gunicorn_config.py puis ouvre --clients
+connexions simultanées sur /api/extract, chacune pour une URL différente dont
+le faux site répond en --delay secondes. Pendant la charge, /health est
+interrogé en continu : sa latence montre si un client rapide reste servi
+pendant que les extractions lentes attendent.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cold_start import free_port
+from fake_site import start_server
+from loadtest import percentile
+
+def start_gunicorn(mode, args, site):
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="concurrency-")
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        SERVER_MODE=mode,
+        THREADS=str(args.threads),
+        CACHE_DB_PATH="",
+        JOBS_DB_PATH="",
+        METRICS_DIR=os.path.join(workdir, "metrics"),
+        COBALT_API_URL=f"{site}/cobalt/api/json",
+        PROXY_SOURCE_URL="",
+        RELAY_ALLOW_PRIVATE="1",
+        RATE_LIMIT_DEFAULT="1000:1000",
+        EXTRACT_WORKERS=str(args.extract_workers),
+        # Le faux site est un seul hôte : ne pas brider les connexions vers lui
+        HTTP_MAX_PER_HOST=str(args.extract_workers),
+        HTTP_MAX_CONNECTIONS=str(args.extract_workers * 2),
+    )
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "-c", "gunicorn_config.py",
+        "--workers", str(args.workers),
+        "--log-level", "warning",
+        "--access-logfile", "/dev/null",
+        "server:app",
+    ]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    target = f"http://127.0.0.1:{port}"
+    started = time.time()
+    while time.time() - started < 60:
+        try:
+            if httpx.get(f"{target}/health", timeout=1).status_code == 200:
+                return process, target
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+def run_mode(mode, args, site):
+    process, target = start_gunicorn(mode, args, site)
+    client = httpx.Client(
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients),
+    )
+    run_id = int(time.time())
+    urls = [f"{site}/video/{mode}-{run_id}-{i}.mp4?delay={args.delay}" for i in range(args.clients)]
+
+    # Sonde /health pendant toute la charge
+    stop = Event()
+    health = []
+
+    def probe():
+        with httpx.Client(timeout=args.timeout) as probe_client:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    ok = probe_client.get(f"{target}/health").status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                health.append((ok, (time.perf_counter() - started) * 1000))
+                time.sleep(0.1)
+
+    def one(url):
+        started = time.perf_counter()
+        try:
+            status = client.get(f"{target}/api/extract", params={"url": url}).status_code
+        except httpx.HTTPError:
+            status = 0
+        return status, (time.perf_counter() - started) * 1000
+
+    try:
+        prober = Thread(target=probe, daemon=True)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            results = list(executor.map(one, urls))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+    finally:
+        client.close()
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = [ms for _, ms in results]
+    health_ms = [ms for ok, ms in health if ok]
+    return {
+        "mode": mode,
+        "clients": args.clients,
+        "duration_s": round(elapsed, 3),
+        "succeeded": statuses.get("200", 0),
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p99": round(percentile(latencies, 99), 1),
+        },
+        "health_ms": {
+            "probes": len(health),
+            "failed": len(health) - len(health_ms),
+            "p50": round(percentile(health_ms, 50), 1) if health_ms else None,
+            "max": round(max(health_ms), 1) if health_ms else None,
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200, help="Connexions simultanées")
+    parser.add_argument("--delay", type=float, default=1.0, help="Latence du faux site par extraction, en secondes")
+    parser.add_argument("--workers", type=int, default=2, help="Workers gunicorn")
+    parser.add_argument("--threads", type=int, default=100, help="THREADS par worker en mode threads")
+    parser.add_argument("--extract-workers", type=int, default=32, help="EXTRACT_WORKERS par worker gunicorn")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--modes", default="sync,threads")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    server, site = start_server()
+    results = [run_mode(mode, args, site) for mode in args.modes.split(",")]
+    server.shutdown()
+
+    for result in results:
+        print(
+            f"{result['mode']:<8} {result['succeeded']}/{result['clients']} ok in {result['duration_s']}s  "
+            f"{result['throughput_rps']} req/s  p50={result['latency_ms']['p50']}ms "
+            f"p99={result['latency_ms']['p99']}ms  statuses={result['statuses']}  "
+            f"/health p50={result['health_ms']['p50']}ms max={result['health_ms']['max']}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Faux site vidéo local pour les benchmarks, sans accès réseau
+
+Routes servies :
+    /<...>.mp4              fichier MP4 factice, avec support des requêtes Range
+    /page/<id>              page HTML contenant une balise <video>
+    /hls/<id>/master.m3u8   playlist maître HLS
+    /hls/<id>/index.m3u8    playlist média HLS
+    /hls/<id>/seg<n>.ts     segment HLS
+    /dead/<id>              404, pour les chemins d'échec
+    POST /cobalt/api/json   remplaçant local de l'API cobalt
+
+Le paramètre ?delay=<secondes> ajoute une latence à n'importe quelle route.
+"""
+import json
+import re
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+
+# Motif de longueur première : chaque plage d'octets a un contenu distinct
+PATTERN = bytes(range(251))
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # File d'attente de listen() : 5 par défaut, trop peu pour des centaines de clients
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients qui ferment une connexion keep-alive : normal en benchmark
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """Faux hébergeur vidéo : pages, MP4, HLS et API cobalt"""
+
+    # Keep-alive, comme un vrai hébergeur
+    protocol_version = "HTTP/1.1"
+    # Taille du MP4 factice et des segments HLS
+    video_size = 1024
+    segment_size = 188 * 64
+    segments = 3
+    # Latence ajoutée à chaque réponse, en secondes
+    latency = 0.0
+
+    @staticmethod
+    def content(size, offset=0):
+        """Octets déterministes, pour pouvoir vérifier un téléchargement par plages"""
+        start = offset % len(PATTERN)
+        return (PATTERN[start:] + PATTERN * (size // len(PATTERN) + 1))[:size]
+
+    def parsed(self):
+        url = urlparse(self.path)
+        delay = float(parse_qs(url.query).get("delay", [self.latency])[0])
+        if delay:
+            time.sleep(delay)
+        return url.path
+
+    def respond(self, status, content_type, body, head=False, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def serve_file(self, content_type, size, head):
+        """Fichier complet ou plage demandée par l'en-tête Range"""
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if not match or (not match.group(1) and not match.group(2)):
+            return self.respond(200, content_type, self.content(size), head, {"Accept-Ranges": "bytes"})
+
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:
+            start = max(size - int(match.group(2)), 0)
+            end = size - 1
+        if start >= size or start > end:
+            return self.respond(416, content_type, b"", head, {"Content-Range": f"bytes */{size}"})
+
+        self.respond(206, content_type, self.content(end - start + 1, start), head, {
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        })
+
+    def route(self, head=False):
+        path = self.parsed()
+
+        if path.startswith("/dead/"):
+            return self.respond(404, "text/plain", b"Not found", head)
+
+        if path.endswith(".mp4"):
+            return self.serve_file("video/mp4", self.video_size, head)
+
+        if path.endswith(".ts"):
+            return self.serve_file("video/mp2t", self.segment_size, head)
+
+        match = re.fullmatch(r"/hls/([^/]+)/master\.m3u8", path)
+        if match:
+            body = (
+                "#EXTM3U\n"
+                '#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n'
+                "index.m3u8\n"
+            ).encode()
+            return self.respond(200, "application/vnd.apple.mpegurl", body, head)
+
+        match = re.fullmatch(r"/hls/([^/]+)/index\.m3u8", path)
+        if match:
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+            for n in range(self.segments):
+                lines += ["#EXTINF:4.0,", f"seg{n}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            return self.respond(200, "application/vnd.apple.mpegurl", ("\n".join(lines) + "\n").encode(), head)
+
+        match = re.fullmatch(r"/page/([^/]+)", path)
+        if match:
+            video_id = match.group(1)
+            body = (
+                f"<html><head><title>Episode {video_id}</title></head><body>"
+                f'<video controls><source src="/video/{video_id}.mp4" type="video/mp4"></video>'
+                "</body></html>"
+            ).encode()
+            return self.respond(200, "text/html; charset=utf-8", body, head)
+
+        self.respond(404, "text/plain", b"Not found", head)
+
+    def do_HEAD(self):
+        self.route(head=True)
+
+    def do_GET(self):
+        self.route()
+
+    def do_POST(self):
+        path = self.parsed()
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if path == "/cobalt/api/json":
+            video_id = zlib.crc32(payload.get("url", "").encode())
+            host = self.headers.get("Host")
+            body = json.dumps({"status": "stream", "url": f"http://{host}/video/cobalt-{video_id}.mp4"}).encode()
+            return self.respond(200, "application/json", body)
+
+        self.respond(404, "text/plain", b"Not found")
+
+    def log_message(self, *args):
+        pass
+
+def start_server(handler=FakeSiteHandler, port=0):
+    """Démarre le serveur dans un thread et retourne (serveur, URL de base)"""
+    server = QuietHTTPServer(("127.0.0.1", port), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -0,0 +1,179 @@
+"""Test de charge hors ligne de /api/extract
+
+Usage : python bench/loadtest.py [--concurrency 16] [--requests 200] [--output results.json]
+        python bench/loadtest.py --target http://127.0.0.1:8000   (serveur déjà lancé)
+
+Démarre le faux site vidéo (MP4, pages HTML, HLS, API cobalt) et, sans
+--target, l'application dans ce processus, puis mesure débit et latences
+p50/p95/p99 pour trois charges :
+    cold    URLs jamais vues, cache vidé
+    warm    URLs déjà en cache
+    mixed   80 % d'URLs chaudes, 15 % nouvelles, 5 % mortes (fallback cobalt)
+Les résultats sont écrits en JSON pour comparer deux exécutions.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_site import start_server
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def start_app(site, args):
+    """Lance server.py dans ce processus, configuré pour ne jamais sortir sur le réseau"""
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ.update({
+        "CACHE_DB_PATH": os.path.join(workdir, "cache.db"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "COBALT_API_URL": f"{site}/cobalt/api/json",
+        "PROXY_SOURCE_URL": "",
+        # Le faux site écoute sur 127.0.0.1 : relais autorisé vers lui s'il est activé
+        "RELAY_ALLOW_PRIVATE": "1",
+        "RATE_LIMIT_DEFAULT": args.rate_limit,
+        "EXTRACT_WORKERS": str(args.workers),
+        "EXTRACT_QUEUE": str(args.queue),
+    })
+    sys.path.insert(0, ROOT)
+    import logging
+    from werkzeug.serving import make_server
+    import server
+
+    # Journal d'accès et échecs attendus (URLs mortes) : bruit pendant la mesure
+    logging.disable(logging.ERROR)
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{httpd.server_port}"
+
+def video_url(site, kind, name):
+    if kind == "page":
+        return f"{site}/page/{name}"
+    if kind == "hls":
+        return f"{site}/hls/{name}/master.m3u8"
+    if kind == "dead":
+        return f"{site}/dead/{name}"
+    return f"{site}/video/{name}.mp4"
+
+def run_workload(client, target, urls, concurrency):
+    """Envoie toutes les requêtes avec `concurrency` clients simultanés"""
+    def one(url):
+        started = time.perf_counter()
+        try:
+            status = client.get(f"{target}/api/extract", params={"url": url}).status_code
+        except httpx.HTTPError:
+            status = 0
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, urls))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds * 1000 for _, seconds in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(results),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        },
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="URL d'un serveur déjà lancé (sinon : application dans ce processus)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes par charge")
+    parser.add_argument("--hot", type=int, default=20, help="Nombre d'URLs chaudes")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence du faux site, en secondes")
+    parser.add_argument("--workloads", default="cold,warm,mixed")
+    parser.add_argument("--workers", type=int, default=8, help="EXTRACT_WORKERS de l'application locale")
+    parser.add_argument("--queue", type=int, default=64, help="EXTRACT_QUEUE de l'application locale")
+    parser.add_argument("--rate-limit", default="1000:1000", help="RATE_LIMIT_DEFAULT de l'application locale")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fake, site = start_server()
+    fake.RequestHandlerClass.latency = args.latency
+    target = args.target or start_app(site, args)
+
+    client = httpx.Client(
+        timeout=120,
+        limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+    )
+    kinds = ("mp4", "page", "hls")
+    run_id = int(time.time())
+    hot = [video_url(site, kinds[i % len(kinds)], f"hot-{run_id}-{i}") for i in range(args.hot)]
+
+    workloads = {}
+    for name in args.workloads.split(","):
+        if name == "cold":
+            client.post(f"{target}/api/clear-cache")
+            urls = [video_url(site, kinds[i % len(kinds)], f"cold-{run_id}-{i}") for i in range(args.requests)]
+        elif name == "warm":
+            for url in hot:
+                client.get(f"{target}/api/extract", params={"url": url})
+            urls = [random.choice(hot) for _ in range(args.requests)]
+        elif name == "mixed":
+            urls = []
+            for i in range(args.requests):
+                roll = random.random()
+                if roll < 0.80:
+                    urls.append(random.choice(hot))
+                elif roll < 0.95:
+                    urls.append(video_url(site, kinds[i % len(kinds)], f"mixed-{run_id}-{i}"))
+                else:
+                    urls.append(video_url(site, "dead", f"mixed-{run_id}-{i}"))
+        else:
+            parser.error(f"Unknown workload: {name}")
+
+        workloads[name] = run_workload(client, target, urls, args.concurrency)
+        result = workloads[name]
+        print(
+            f"{name:<6} {result['throughput_rps']:>8} req/s  "
+            f"p50={result['latency_ms']['p50']}ms p95={result['latency_ms']['p95']}ms "
+            f"p99={result['latency_ms']['p99']}ms  statuses={result['statuses']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "revision": git_revision(),
+                "config": {k: v for k, v in vars(args).items() if k != "output"},
+                "workloads": workloads,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
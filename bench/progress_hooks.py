@@ -0,0 +1,95 @@
+"""Coût des hooks de progression : mise à jour Rich à chaque appel vs ProgressReporter
+
+Usage : python bench/progress_hooks.py [--videos 8] [--fragments 16] [--calls 2000]
+
+Simule videos × fragments threads qui appellent le hook de progression
+comme yt-dlp le fait pendant un téléchargement par fragments, avec un
+affichage Live actif (rendu dans un terminal factice).
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from threading import Barrier, Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rich.console import Console
+from rich.live import Live
+from rich.progress import BarColumn, Progress, TransferSpeedColumn
+
+from progress_reporter import ProgressReporter
+
+def make_progress():
+    console = Console(file=io.StringIO(), force_terminal=True, width=120)
+    return console, Progress("{task.fields[episode_name]}", BarColumn(), TransferSpeedColumn(), console=console)
+
+def run(label, videos, fragments, calls, make_hook):
+    """Chaque thread appelle le hook `calls` fois ; retourne le temps moyen par appel"""
+    console, progress = make_progress()
+    tasks = [progress.add_task("download", episode_name=f"ep{i}", total=None) for i in range(videos)]
+    hooks = [make_hook(progress, task_id) for task_id in tasks]
+    barrier = Barrier(videos * fragments + 1)
+
+    def fragment(hook):
+        barrier.wait()
+        for n in range(calls):
+            hook({"status": "downloading", "downloaded_bytes": n * 1024, "total_bytes": calls * 1024})
+
+    threads = [Thread(target=fragment, args=(hook,)) for hook in hooks for _ in range(fragments)]
+    with Live(progress, console=console, refresh_per_second=10):
+        for thread in threads:
+            thread.start()
+        cpu = time.process_time()
+        started = time.perf_counter()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+
+    per_call = wall / (len(threads) * calls) * 1e6
+    print(f"{label:<10} {per_call:8.2f}us/call  wall={wall:6.2f}s  cpu={cpu:6.2f}s")
+    return per_call
+
+def direct_hook(progress, task_id):
+    task = progress.tasks[task_id]
+
+    def hook(data):
+        if data.get("status") != "downloading":
+            return
+        task.total = data.get("total_bytes") or data.get("total_bytes_estimate")
+        progress.update(task_id, completed=data.get("downloaded_bytes", 0))
+
+    return hook
+
+def reporter_hook(progress, task_id):
+    if task_id == 0:
+        reporter_hook.reporter = ProgressReporter(progress)
+        reporter_hook.reporter.start()
+    reporter = reporter_hook.reporter
+    reporter.add(task_id, f"ep{task_id}")
+
+    def hook(data):
+        if data.get("status") != "downloading":
+            return
+        reporter.report(task_id, data.get("downloaded_bytes", 0),
+                        data.get("total_bytes") or data.get("total_bytes_estimate"))
+
+    return hook
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--fragments", type=int, default=16, help="Threads de fragments par vidéo")
+    parser.add_argument("--calls", type=int, default=2000, help="Appels du hook par thread")
+    args = parser.parse_args()
+
+    print(f"{args.videos} videos x {args.fragments} fragment threads x {args.calls} calls")
+    before = run("direct", args.videos, args.fragments, args.calls, direct_hook)
+    after = run("reporter", args.videos, args.fragments, args.calls, reporter_hook)
+    print(f"hook cost: {before / after:.1f}x lower")
+
+if __name__ == "__main__":
+    main()
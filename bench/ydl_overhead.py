@@ -0,0 +1,66 @@
+"""Coût par appel de extract_info : YoutubeDL neuf à chaque appel vs pool
+
+Usage : python bench/ydl_overhead.py [--calls 50]
+
+Tout tourne en local : un petit serveur HTTP sert un faux MP4 que
+l'extracteur générique de yt-dlp résout directement.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yt_dlp
+from ydl_pool import YoutubeDLPool
+from fake_site import start_server
+
+def measure(label, calls, extract):
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        extract(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:<12} mean={statistics.mean(timings):7.2f}ms "
+        f"p50={statistics.median(timings):7.2f}ms "
+        f"first={timings[0]:7.2f}ms"
+    )
+    return statistics.mean(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    server, base = start_server()
+
+    ydl_opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True,
+        "format": "best[ext=mp4]/best",
+        "socket_timeout": 30,
+        "http_headers": {"User-Agent": "bench"},
+    }
+
+    def fresh(i):
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(f"{base}/video{i}.mp4", download=False)
+
+    pool = YoutubeDLPool()
+
+    def pooled(i):
+        with pool.checkout(ydl_opts) as ydl:
+            return ydl.extract_info(f"{base}/video{i}.mp4", download=False)
+
+    before = measure("fresh", args.calls, fresh)
+    after = measure("pooled", args.calls, pooled)
+    print(f"speedup      x{before / after:.2f}  ({before - after:.2f}ms saved per call)")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
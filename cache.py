@@ -0,0 +1,366 @@
+# cache.py
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+from threading import Lock, Thread, local
+
+logger = logging.getLogger(__name__)
+
+def entry_size(value):
+    """Taille approximative d'une entrée, en octets"""
+    try:
+        return len(json.dumps(value))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+# Paramètres d'URL signées portant un timestamp d'expiration
+EXPIRY_PARAMS = ("expire", "expires", "exp", "expiry", "validto")
+EXPIRY_PATH = re.compile(r"/(?:expire|expires|exp)/(\d{9,})")
+
+def url_expiry(url):
+    """Timestamp d'expiration embarqué dans une URL signée, ou None"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    candidates = []
+    for name, values in parse_qs(parsed.query).items():
+        if name.lower() in EXPIRY_PARAMS:
+            candidates.extend(values)
+    match = EXPIRY_PATH.search(parsed.path)
+    if match:
+        candidates.append(match.group(1))
+
+    for value in candidates:
+        try:
+            timestamp = float(value)
+        except ValueError:
+            continue
+        # Millisecondes -> secondes
+        if timestamp > 1e11:
+            timestamp /= 1000
+        if timestamp > 1e9:
+            return timestamp
+    return None
+
+def ttl_for_stream(url, default, margin=60, max_ttl=6 * 3600):
+    """Durée de vie d'un lien direct, dérivée de sa signature si possible"""
+    expiry = url_expiry(url) if url else None
+    if expiry is None:
+        return default
+    # Marge pour ne jamais servir un lien sur le point d'expirer
+    return max(0, min(expiry - time.time() - margin, max_ttl))
+
+# Cache LRU borné avec expiration
+class SimpleCache:
+    def __init__(self, ttl_seconds=1800, max_entries=5000, max_bytes=16 * 1024 * 1024):
+        self.cache = OrderedDict()
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sweeper = None
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        """Retourne (valeur, date d'insertion, date d'expiration) ou None"""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                data, stored_at, expires_at, size = entry
+                if time.time() < expires_at:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return data, stored_at, expires_at
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None, stored_at=None):
+        size = entry_size(value)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            if key in self.cache:
+                self._remove(key)
+            if expires_at <= now:
+                return
+            self.cache[key] = (value, stored_at or now, expires_at, size)
+            self.bytes += size
+            # Éviction des entrées les moins récemment utilisées
+            while self.cache and (len(self.cache) > self.max_entries or self.bytes > self.max_bytes):
+                self._remove(next(iter(self.cache)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        size = self.cache.pop(key)[3]
+        self.bytes -= size
+
+    def sweep(self):
+        """Supprime toutes les entrées expirées"""
+        now = time.time()
+        with self.lock:
+            expired = [key for key, entry in self.cache.items() if entry[2] <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def start_sweeper(self, interval=60):
+        """Lance le nettoyage périodique en arrière-plan"""
+        if self.sweeper is not None and self.sweeper.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep()
+                    if removed:
+                        logger.info(f"Cache sweep: {removed} expired entries removed")
+                except Exception as e:
+                    logger.warning(f"Cache sweep failed: {e}")
+
+        self.sweeper = Thread(target=run, daemon=True)
+        self.sweeper.start()
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.bytes = 0
+
+    def size(self):
+        return len(self.cache)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.cache),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+class SQLiteCache:
+    """Cache persistant partagé entre tous les workers d'une même machine"""
+
+    def __init__(self, path, ttl_seconds=1800):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.local = local()
+        self.pid = os.getpid()
+        self.writes = 0
+
+        conn = self.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "stored_at REAL NOT NULL DEFAULT 0)"
+        )
+        # Bases créées avant l'ajout de stored_at
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(cache)")]
+        if "stored_at" not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN stored_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('generation', 0)")
+
+    def connection(self):
+        """Une connexion par thread, en mode WAL pour les lectures concurrentes"""
+        # Ne jamais réutiliser une connexion héritée du master après un fork
+        if self.pid != os.getpid():
+            self.local = local()
+            self.pid = os.getpid()
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get_entry(self, key):
+        """Retourne (valeur, date d'insertion, date d'expiration) ou None"""
+        row = self.connection().execute(
+            "SELECT value, stored_at, expires_at FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        conn = self.connection()
+        if ttl <= 0:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now)
+        )
+        # Purge périodique des entrées expirées
+        self.writes += 1
+        if self.writes % 200 == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def clear(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache")
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def generation(self):
+        """Incrémenté à chaque vidage, pour invalider les caches L1 des autres workers"""
+        row = self.connection().execute(
+            "SELECT value FROM meta WHERE name = 'generation'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def size(self):
+        return self.connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+class TieredCache:
+    """Cache L1 en mémoire devant un cache L2 SQLite partagé"""
+
+    def __init__(self, path, ttl_seconds=1800, generation_check=1.0, **l1_options):
+        self.l1 = SimpleCache(ttl_seconds, **l1_options)
+        self.ttl = ttl_seconds
+        self.l2 = None
+        self.l2_hits = 0
+        self.lock = Lock()
+        self.generation_check = generation_check
+        self.generation = 0
+        self.checked_at = 0
+
+        try:
+            self.l2 = SQLiteCache(path, ttl_seconds)
+            self.generation = self.l2.generation()
+            self.checked_at = time.time()
+            logger.info(f"Shared cache: {path}")
+        except Exception as e:
+            logger.warning(f"Shared cache unavailable, using memory only: {e}")
+
+    def sync_generation(self):
+        """Vide le L1 si un autre worker a vidé le cache partagé"""
+        now = time.time()
+        if now - self.checked_at < self.generation_check:
+            return
+        with self.lock:
+            if now - self.checked_at < self.generation_check:
+                return
+            self.checked_at = now
+            generation = self.l2.generation()
+            if generation != self.generation:
+                self.generation = generation
+                self.l1.clear()
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        if self.l2 is None:
+            return self.l1.get_entry(key)
+
+        try:
+            self.sync_generation()
+            entry = self.l1.get_entry(key)
+            if entry is not None:
+                return entry
+
+            entry = self.l2.get_entry(key)
+            if entry is None:
+                return None
+            data, stored_at, expires_at = entry
+            with self.lock:
+                self.l2_hits += 1
+            # Remonter dans le L1 pour la durée de vie restante
+            self.l1.set(key, data, expires_at - time.time(), stored_at)
+            return entry
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return self.l1.get_entry(key)
+
+    def set(self, key, value, ttl=None):
+        self.l1.set(key, value, ttl)
+        if self.l2 is None:
+            return
+        try:
+            self.l2.set(key, value, ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def clear(self):
+        self.l1.clear()
+        if self.l2 is not None:
+            self.l2.clear()
+            self.generation = self.l2.generation()
+
+    def size(self):
+        if self.l2 is None:
+            return self.l1.size()
+        try:
+            return self.l2.size()
+        except sqlite3.Error:
+            return self.l1.size()
+
+    def start_sweeper(self, interval=60):
+        self.l1.start_sweeper(interval)
+
+    def stats(self):
+        stats = self.l1.stats()
+        stats["l2_hits"] = self.l2_hits
+        if self.l2 is not None:
+            try:
+                stats["l2_size"] = self.l2.size()
+            except sqlite3.Error:
+                pass
+        return stats
+
+def create_cache(ttl_seconds=1800):
+    """Cache partagé si CACHE_DB_PATH n'est pas vide, sinon cache mémoire par worker"""
+    options = {
+        "max_entries": int(os.environ.get("CACHE_MAX_ENTRIES", 5000)),
+        "max_bytes": int(os.environ.get("CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    }
+    path = os.environ.get(
+        "CACHE_DB_PATH",
+        os.path.join(tempfile.gettempdir(), "video_extractor_cache.db")
+    )
+    if not path:
+        cache = SimpleCache(ttl_seconds, **options)
+    else:
+        cache = TieredCache(path, ttl_seconds, **options)
+    return cache
@@ -1,18 +1,26 @@
+import json
+import multiprocessing
+import os
 import random
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
-from typing import cast
+from threading import Condition, Lock
+from typing import Literal, NamedTuple, cast
 from urllib.parse import urlparse
 
 import httpx
-from yt_dlp import YoutubeDL
+from yt_dlp import YoutubeDL, postprocessor
 from yt_dlp.utils import DownloadError
 from rich import get_console
 from rich.live import Live
-from rich.console import Group
-from rich.table import Column
+from rich.console import Console, ConsoleOptions, Group
+from rich.filesize import decimal
+from rich.table import Column, Table
 from rich.progress import (
     BarColumn,
     Progress,
@@ -29,11 +37,18 @@ from .episode_extra_info import EpisodeWithExtraInfo
 from .error_handeling import YDL_log_filter, reaction_to
 from ..langs import Lang
 from .config import PlayersConfig, config
+from .http_client import PooledHTTPClient
+from .progress_reporter import ProgressReporter
+from .ranged_download import RangedDownload, RangesUnsupported
 
 
 logger = logging.getLogger(__name__)
 logger.addFilter(YDL_log_filter)
 
+# Shared across download threads so probes and ranges reuse keep-alive connections,
+# with at most max_per_host of them on a single player host
+http_client = PooledHTTPClient(max_connections=20, max_per_host=8, timeout=5.0)
+
 console = get_console()
 download_progress_list: list[str | ProgressColumn] = [
     "[bold blue]{task.fields[episode_name]}",
@@ -63,6 +78,350 @@ total_progress = Progress(
     console=console,
 )
 progress = Group(total_progress, download_progress)
+# Hooks hand their progress to this reporter, which updates the display a few times per second
+reporter = ProgressReporter(download_progress)
+
+Outcome = Literal["success", "next", "retry"]
+
+
+def _full_path(episode: EpisodeWithExtraInfo, path: Path, episode_path: str) -> Path:
+    return (
+        path
+        / episode_path.format(
+            serie=episode.warpped.serie_name,
+            season=episode.warpped.season_name,
+            episode=episode.warpped.name,
+            release_year_parentheses=episode.release_year_parentheses(),
+        )
+    ).expanduser()
+
+
+def _ydl_option(
+    full_path: Path,
+    hook: Callable[[dict], None],
+    concurrent_fragment_downloads: int,
+    format: str,
+    format_sort: str,
+) -> dict:
+    return {
+        "outtmpl": f"{full_path}.%(ext)s",
+        "concurrent_fragment_downloads": concurrent_fragment_downloads,
+        "progress_hooks": [hook],
+        "logger": logger,
+        "format": format,
+        "format_sort": format_sort.split(","),
+    }
+
+
+class _DeferringYoutubeDL(YoutubeDL):
+    """
+    YoutubeDL that only downloads: the post-processing of each file is
+    recorded in `deferred`, to be run by the post-processing stage.
+    """
+
+    def __init__(self, params: dict, deferred: list[dict]):
+        super().__init__(params)  # type: ignore
+        self.deferred = deferred
+
+    def post_process(self, filename, info, files_to_move=None):
+        # Merges and fixups added by process_info are built as cls(ydl): their name is enough
+        postprocessors = [type(pp).__name__ for pp in info.pop("__postprocessors", None) or []]
+        self.deferred.append(
+            {
+                "filename": filename,
+                "info": self.sanitize_info(dict(info)),
+                "postprocessors": postprocessors,
+                "files_to_move": files_to_move or {},
+            }
+        )
+        info["filepath"] = filename
+        return info
+
+
+def _post_process(params: dict, task: dict) -> str | None:
+    """Run deferred post-processing in a worker process; return the final file."""
+    with YoutubeDL(params) as ydl:  # type: ignore
+        info = task["info"]
+        info["__postprocessors"] = [getattr(postprocessor, name)(ydl) for name in task["postprocessors"]]
+        info = ydl.post_process(task["filename"], info, task["files_to_move"])
+        return info.get("filepath")
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class PostProcessingStage:
+    """
+    Second pipeline stage: merges and remuxes run in worker processes while
+    the download workers go on with the next episodes.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor: ProcessPoolExecutor | None = None
+        # Threads that wait for the processes, so the callers never block
+        self.waiters = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="post-process")
+        self.lock = Lock()
+        self.task_id: TaskID | None = None
+        self.submitted = 0
+
+    def submit(self, params: dict, tasks: list[dict], on_done: Callable[[str | None, Exception | None], None]) -> None:
+        with self.lock:
+            if self.executor is None:
+                # Forking here would copy locks held by the display, probe and fragment threads
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_process_context())
+                self.task_id = total_progress.add_task("Post-processed", total=0)
+            self.submitted += 1
+            total_progress.update(self.task_id, total=self.submitted)
+            executor = self.executor
+
+        def run() -> str | None:
+            filepath = None
+            for task in tasks:
+                filepath = executor.submit(_post_process, params, task).result()
+            return filepath
+
+        future: Future = self.waiters.submit(run)
+
+        def done(future: Future) -> None:
+            error = future.exception()
+            on_done(None if error else future.result(), cast(Exception | None, error))
+            if self.task_id is not None:
+                total_progress.update(self.task_id, advance=1)
+
+        future.add_done_callback(done)
+
+    def close(self) -> None:
+        """Wait for the post-processing still running."""
+        self.waiters.shutdown(wait=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def _progressive_url(info: dict) -> str | None:
+    """URL of a single-file source that can be fetched by ranges, None otherwise."""
+    if info.get("_type", "video") != "video" or info.get("requested_formats") or info.get("is_live"):
+        return None
+    if info.get("protocol") not in ("http", "https"):
+        return None
+    return info.get("url")
+
+
+def _ydl_download(ydl: YoutubeDL, player: str, option: dict) -> int:
+    """
+    Download `player`, splitting progressive files into byte ranges fetched
+    over `concurrent_fragment_downloads` connections. Fragmented sources and
+    servers without Range support are left to yt-dlp.
+    """
+    connections = option.get("concurrent_fragment_downloads", 1)
+    if connections <= 1:
+        return cast(int, ydl.download([player]))
+
+    info = cast(dict, ydl.extract_info(player, download=False))
+    url = _progressive_url(info)
+    if url is not None:
+        filename = Path(ydl.prepare_filename(info))
+        filename.parent.mkdir(parents=True, exist_ok=True)
+
+        def hook(data: dict) -> None:
+            for progress_hook in option["progress_hooks"]:
+                progress_hook(data)
+
+        try:
+            if filename.exists():
+                hook({"status": "finished", "filename": str(filename)})
+            else:
+                RangedDownload(
+                    http_client,
+                    url,
+                    filename,
+                    headers=info.get("http_headers"),
+                    connections=connections,
+                    progress_hook=hook,
+                ).run()
+            return 0
+        except RangesUnsupported as exception:
+            logger.debug(f"{exception}, falling back to a single connection")
+        except Exception as exception:
+            # yt-dlp has its own retries, and resumes from its own partial file
+            logger.warning(f"Ranged download failed ({exception}), falling back to a single connection")
+
+    # Same as YoutubeDL.download, without extracting the player again
+    ydl.process_ie_result(info, download=True)
+    return 0
+
+
+def _try_player(player: str, option: dict, deferred: list[dict] | None = None) -> Outcome:
+    """
+    Make one download attempt with this player.
+    Return "next" when the player should be given up on.
+
+    With `deferred`, post-processing is not run but appended to that list.
+    """
+    # Check if the video is not accessible through vidmoly
+    try:
+        if (
+            player.startswith("https://vidmoly.")
+            and "Please wait"  # Note "Please wait" appear in all the player page
+            not in http_client.get(player, headers={"User-Agent": ""}).text
+        ):
+            return "next"
+    except httpx.ConnectError:
+        return "next"
+
+    try:
+        with (
+            YoutubeDL(option) if deferred is None else _DeferringYoutubeDL(option, deferred)  # type: ignore
+        ) as ydl:
+            error_code = _ydl_download(ydl, player, option)
+
+            if not error_code:
+                return "success"
+
+            logger.fatal(
+                f"The download encountered an error code {error_code}. Please report this to the developer with URL: {player}",
+            )
+            return "next"
+
+    except DownloadError as exception:
+        # yt-dlp thinks vidmoly is unsupported but it just need wait
+        if (
+            player.startswith("https://vidmoly.")
+            and exception.msg is not None
+            and "Unsupported URL: https://vidmoly.net/" in exception.msg
+        ):
+            exception.msg = "Waiting for vidmoly"
+
+        match reaction_to(exception.msg):
+            case "continue":
+                return "next"
+
+            case "retry":
+                return "retry"
+
+            case "crash":
+                raise exception
+
+            case _:
+                logger.fatal(
+                    "The above error wasn't handle. Please report it to the developer with URL: %s",
+                    player,
+                )
+                return "next"
+
+
+def _retry_delay(retry_time: int) -> float:
+    # random is used to spread the resume time and so mitigate deadlock when multiple downloads resume at the same time
+    return retry_time * random.uniform(0.8, 1.2)
+
+
+def _finish(task_id: TaskID) -> None:
+    reporter.finish(task_id)
+    download_progress.update(task_id, visible=False)
+    if total_progress.tasks:
+        total_progress.update(TaskID(0), advance=1)
+
+
+class ProbeResult(NamedTuple):
+    reachable: bool
+    ttfb: float = 0.0
+    throughput: float = 0.0
+
+    def cost(self, size: int = 1024 * 1024) -> float:
+        """Estimated seconds to fetch `size` bytes from this host."""
+        if not self.reachable:
+            return float("inf")
+        return self.ttfb + size / max(self.throughput, 1.0)
+
+
+class PlayerProbe:
+    """
+    Pre-flight check of player hosts: reachability, time to first byte and
+    throughput of a short ranged read, measured concurrently and once per
+    host for the session.
+
+    The sample is read from the player URL itself; the video is often served
+    by another host, so this ranks mirrors rather than predicting speeds.
+    """
+
+    def __init__(self, sample_size: int = 256 * 1024, timeout: float = 10.0, workers: int = 8):
+        self.sample_size = sample_size
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe")
+        self.results: dict[str, ProbeResult] = {}
+        self.lock = Lock()
+
+    def measure(self, player: str) -> ProbeResult:
+        started = time.perf_counter()
+        try:
+            with http_client.stream(
+                "GET",
+                player,
+                headers={"Range": f"bytes=0-{self.sample_size - 1}"},
+                timeout=self.timeout,
+                follow_redirects=True,
+            ) as response:
+                ttfb = time.perf_counter() - started
+                if response.status_code >= 400:
+                    return ProbeResult(False)
+
+                size = 0
+                for chunk in response.iter_bytes():
+                    size += len(chunk)
+                    if size >= self.sample_size or time.perf_counter() - started > self.timeout:
+                        break
+                elapsed = time.perf_counter() - started - ttfb
+                return ProbeResult(True, ttfb, size / max(elapsed, 1e-3))
+        except httpx.HTTPError:
+            return ProbeResult(False)
+
+    def probe(self, players: list[str]) -> None:
+        """Measure, in parallel, every host of `players` not measured yet."""
+        todo: dict[str, str] = {}
+        with self.lock:
+            for player in players:
+                host = urlparse(player).hostname or ""
+                if host not in self.results and host not in todo:
+                    todo[host] = player
+
+        futures = {self.executor.submit(self.measure, player): host for host, player in todo.items()}
+        wait(futures, timeout=self.timeout * 2)
+        with self.lock:
+            for future, host in futures.items():
+                self.results[host] = future.result() if future.done() else ProbeResult(False)
+
+    def result(self, player: str) -> ProbeResult | None:
+        with self.lock:
+            return self.results.get(urlparse(player).hostname or "")
+
+    def order(self, players: list[str], languages: dict) -> list[str]:
+        """
+        Fastest hosts first, without crossing language boundaries: players
+        keep the language order given by consume_player.
+        """
+        self.probe(players)
+        language_of = {
+            player: language for language, candidates in languages.items() for player in candidates
+        }
+
+        def cost(player: str) -> float:
+            result = self.result(player)
+            return result.cost() if result is not None else float("inf")
+
+        ordered: list[str] = []
+        start = 0
+        for end in range(1, len(players) + 1):
+            if end == len(players) or language_of.get(players[end]) != language_of.get(players[start]):
+                # sorted is stable: equal costs keep the preference order
+                ordered += sorted(players[start:end], key=cost)
+                start = end
+        return ordered
+
+
+# Measurements shared by every download of the session
+player_probe = PlayerProbe()
 
 
 def download(
@@ -75,115 +434,353 @@ def download(
     max_retry_time: int = 1024,
     format: str = "",
     format_sort: str = "",
+    probe: bool = False,
 ) -> None:
+    """
+    With probe, every candidate player is checked up front and the fastest
+    mirrors are tried first within each language.
+    """
     if not any(episode.warpped.languages.values()):
         logger.error("No player available")
         return
 
+    languages = {language: list(players) for language, players in episode.warpped.languages.items()}
+
     me = download_progress.add_task(
         "download", episode_name=episode.warpped.name, site="", total=None
     )
     task = download_progress.tasks[me]
-
-    full_path = (
-        path
-        / episode_path.format(
-            serie=episode.warpped.serie_name,
-            season=episode.warpped.season_name,
-            episode=episode.warpped.name,
-            release_year_parentheses=episode.release_year_parentheses(),
-        )
-    ).expanduser()
+    reporter.add(me, episode.warpped.name)
+    reporter.start()
 
     def hook(data: dict) -> None:
         if data.get("status") != "downloading":
             return
 
-        # Directly accessing .total is needed to not reset the speed
-        task.total = data.get("total_bytes") or data.get("total_bytes_estimate")
-        download_progress.update(me, completed=data.get("downloaded_bytes", 0))
+        reporter.report(
+            me,
+            data.get("downloaded_bytes", 0),
+            data.get("total_bytes") or data.get("total_bytes_estimate"),
+            task.fields.get("site") or "",
+        )
 
-    option = {
-        "outtmpl": f"{full_path}.%(ext)s",
-        "concurrent_fragment_downloads": concurrent_fragment_downloads,
-        "progress_hooks": [hook],
-        "logger": logger,
-        "format": format,
-        "format_sort": format_sort.split(","),
-    }
+    option = _ydl_option(
+        _full_path(episode, path, episode_path),
+        hook,
+        concurrent_fragment_downloads,
+        format,
+        format_sort,
+    )
 
-    for player in episode.warpped.consume_player(
+    players = episode.warpped.consume_player(
         prefer_languages, players_config.prefers, players_config.bans
-    ):
+    )
+    if probe:
+        players = player_probe.order(list(players), languages)
+
+    for player in players:
         retry_time = 1
-        sucess = False
         download_progress.update(me, site=urlparse(player).hostname)
 
-        while True:
-            # Check if the video is not accessible through vidmoly
-            try:
-                if (
-                    player.startswith("https://vidmoly.")
-                    and "Please wait"  # Note "Please wait" appear in all the player page
-                    not in httpx.get(player, headers={"User-Agent": ""}).text
-                ):
-                    break
-            except httpx.ConnectError:
+        while (outcome := _try_player(player, option)) == "retry":
+            if retry_time >= max_retry_time:
                 break
 
-            try:
-                with YoutubeDL(option) as ydl:  # type: ignore
-                    error_code = cast(int, ydl.download([player]))
-
-                    if not error_code:
-                        sucess = True
-                    else:
-                        logger.fatal(
-                            f"The download encountered an error code {error_code}. Please report this to the developer with URL: {player}",
-                        )
-
-                    break
-
-            except DownloadError as exception:
-                # yt-dlp thinks vidmoly is unsupported but it just need wait
-                if (
-                    player.startswith("https://vidmoly.")
-                    and exception.msg is not None
-                    and "Unsupported URL: https://vidmoly.net/" in exception.msg
-                ):
-                    exception.msg = "Waiting for vidmoly"
-
-                match reaction_to(exception.msg):
-                    case "continue":
-                        break
+            logger.warning(
+                f"{episode.warpped.name} interrupted. Retrying in {retry_time}s."
+            )
+            time.sleep(_retry_delay(retry_time))
+            retry_time *= 2
 
-                    case "retry":
-                        if retry_time >= max_retry_time:
-                            break
-
-                        logger.warning(
-                            f"{episode.warpped.name} interrupted. Retrying in {retry_time}s."
-                        )
-                        # random is used to spread the resume time and so mitigate deadlock when multiple downloads resume at the same time
-                        time.sleep(retry_time * random.uniform(0.8, 1.2))
-                        retry_time *= 2
-
-                    case "crash":
-                        raise exception
-
-                    case "":
-                        logger.fatal(
-                            "The above error wasn't handle. Please report it to the developer with URL: %s",
-                            player,
-                        )
-                        break
+        if outcome == "success":
+            break
+
+    _finish(me)
+
+
+class DownloadJournal:
+    """
+    Append-only JSON-lines record of each episode's state, chosen player and
+    output file, kept next to the downloads so an interrupted multi_download
+    can skip finished episodes and resume the others.
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+        self.lock = Lock()
+        self.entries: dict[str, dict] = {}
+
+        lines = 0
+        if file.exists():
+            with file.open(encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash
+                        continue
+                    self.entries.setdefault(record.pop("episode"), {}).update(record)
+                    lines += 1
+
+        if lines > 2 * len(self.entries):
+            self.compact()
+
+    def compact(self) -> None:
+        tmp = self.file.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as journal:
+            for episode, entry in self.entries.items():
+                journal.write(json.dumps({"episode": episode, **entry}) + "\n")
+        os.replace(tmp, self.file)
+
+    def get(self, episode: str) -> dict:
+        with self.lock:
+            return dict(self.entries.get(episode, {}))
+
+    def completed(self, episode: str) -> bool:
+        entry = self.get(episode)
+        return entry.get("state") == "done" and bool(entry.get("file")) and Path(entry["file"]).exists()
+
+    def record(self, episode: str, **fields) -> None:
+        fields["time"] = time.time()
+        with self.lock:
+            self.entries.setdefault(episode, {}).update(fields)
+            with self.file.open("a", encoding="utf-8") as journal:
+                journal.write(json.dumps({"episode": episode, **fields}) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+
+class _Job:
+    """An episode waiting for, or going through, its download attempts."""
+
+    def __init__(
+        self,
+        index: int,
+        episode: EpisodeWithExtraInfo,
+        players: Iterator[str],
+        key: str = "",
+    ):
+        self.index = index
+        self.episode = episode
+        self.key = key
+        self.file: str | None = None
+        self.players = players
+        self.player = next(players, None)
+        self.retry_time = 1
+        self.not_before = 0.0
+        self.task_id: TaskID | None = None
+        self.option: dict = {}
+
+    @property
+    def host(self) -> str:
+        return (urlparse(self.player).hostname or "") if self.player else ""
+
+    def next_player(self) -> None:
+        self.player = next(self.players, None)
+        self.retry_time = 1
+
+
+class HostScheduler:
+    """
+    Hand episodes to download workers, at most `per_host` at a time on the
+    same player host. A worker takes the first ready episode whose player is
+    on the least busy host, so idle hosts are used first. An episode waiting
+    for a retry goes back to the queue instead of holding its worker.
+
+    Also renders per-host throughput for the live progress view.
+    """
+
+    def __init__(self, per_host: int, window: float = 5.0):
+        self.per_host = per_host
+        self.window = window
+        self.pending: list[_Job] = []
+        self.active: dict[str, int] = defaultdict(int)
+        self.running = 0
+        self.condition = Condition()
+        self.samples: dict[str, deque[tuple[float, int]]] = defaultdict(deque)
+        self.totals: dict[str, int] = defaultdict(int)
+
+    def add(self, job: _Job) -> None:
+        with self.condition:
+            self.pending.append(job)
+            self.pending.sort(key=lambda pending: pending.index)
+            self.condition.notify_all()
 
-        if sucess:
+    def acquire(self) -> tuple[_Job, str] | None:
+        """
+        Block until an episode can start, None once every episode is done.
+        Return the job and the host whose slot it holds.
+        """
+        with self.condition:
+            while self.pending or self.running:
+                now = time.monotonic()
+                ready = [
+                    job
+                    for job in self.pending
+                    if job.not_before <= now and self.active[job.host] < self.per_host
+                ]
+                if ready:
+                    job = min(ready, key=lambda job: self.active[job.host])
+                    self.pending.remove(job)
+                    self.active[job.host] += 1
+                    self.running += 1
+                    return job, job.host
+
+                waiting = [job.not_before - now for job in self.pending if job.not_before > now]
+                self.condition.wait(min(waiting) if waiting else None)
+        return None
+
+    def release(self, job: _Job, host: str, requeue: bool) -> None:
+        with self.condition:
+            self.active[host] -= 1
+            self.running -= 1
+            if requeue:
+                self.pending.append(job)
+                self.pending.sort(key=lambda pending: pending.index)
+            self.condition.notify_all()
+
+    def record(self, host: str, size: int) -> None:
+        now = time.monotonic()
+        with self.condition:
+            self.totals[host] += size
+            samples = self.samples[host]
+            samples.append((now, size))
+            while samples and now - samples[0][0] > self.window:
+                samples.popleft()
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> Iterator[Table]:
+        # Not __rich__: Group would render it once and keep that table
+        yield self.table()
+
+    def table(self) -> Table:
+        table = Table("Host", "Active", "Speed", "Downloaded", box=None, header_style="bold green")
+        now = time.monotonic()
+        with self.condition:
+            for host in sorted(self.totals.keys() | self.active.keys()):
+                recent = sum(size for at, size in self.samples[host] if now - at <= self.window)
+                table.add_row(
+                    host,
+                    str(self.active[host]),
+                    f"{decimal(int(recent / self.window))}/s",
+                    decimal(self.totals[host]),
+                )
+        return table
+
+
+def _run_job(
+    job: _Job,
+    host: str,
+    scheduler: HostScheduler,
+    journal: DownloadJournal | None,
+    post_stage: PostProcessingStage | None,
+    path: Path,
+    episode_path: str,
+    concurrent_fragment_downloads: int,
+    max_retry_time: int,
+    format: str,
+    format_sort: str,
+) -> bool:
+    """
+    Try the players of an episode while they stay on `host`.
+    Return True when the episode must go back to the scheduler queue.
+    """
+    if job.task_id is None:
+        me = job.task_id = download_progress.add_task(
+            "download", episode_name=job.episode.warpped.name, site="", total=None
+        )
+        reporter.add(me, job.episode.warpped.name)
+
+        def hook(data: dict) -> None:
+            if data.get("filename"):
+                job.file = data["filename"]
+            if data.get("status") != "downloading":
+                return
+
+            reporter.report(
+                me,
+                data.get("downloaded_bytes", 0),
+                data.get("total_bytes") or data.get("total_bytes_estimate"),
+                job.host,
+            )
+
+        def postprocessor_hook(data: dict) -> None:
+            # Final file, once merged and moved by the post-processors
+            filepath = data.get("info_dict", {}).get("filepath")
+            if data.get("status") == "finished" and filepath:
+                job.file = filepath
+
+        job.option = _ydl_option(
+            _full_path(job.episode, path, episode_path),
+            hook,
+            concurrent_fragment_downloads,
+            format,
+            format_sort,
+        )
+        job.option["postprocessor_hooks"] = [postprocessor_hook]
+
+    while job.player is not None:
+        if job.host != host:
+            # The next player is on another host, which has its own limit
+            return True
+
+        download_progress.update(job.task_id, site=job.host)
+        reporter.restart(job.task_id)
+        if journal is not None:
+            journal.record(job.key, state="downloading", player=job.player)
+        deferred: list[dict] | None = [] if post_stage is not None else None
+        outcome = _try_player(job.player, job.option, deferred)
+
+        if outcome == "success" and deferred:
+            _hand_over(job, journal, post_stage, deferred)  # type: ignore
+            return False
+
+        if outcome == "success":
+            if journal is not None:
+                journal.record(job.key, state="done", player=job.player, file=job.file)
             break
 
-    download_progress.update(me, visible=False)
-    if total_progress.tasks:
-        total_progress.update(TaskID(0), advance=1)
+        if outcome == "retry" and job.retry_time < max_retry_time:
+            logger.warning(
+                f"{job.episode.warpped.name} interrupted. Retrying in {job.retry_time}s."
+            )
+            job.not_before = time.monotonic() + _retry_delay(job.retry_time)
+            job.retry_time *= 2
+            return True
+
+        job.next_player()
+
+    if job.player is None and journal is not None:
+        journal.record(job.key, state="failed")
+    _finish(job.task_id)
+    return False
+
+
+def _hand_over(
+    job: _Job,
+    journal: DownloadJournal | None,
+    post_stage: PostProcessingStage,
+    deferred: list[dict],
+) -> None:
+    """Queue the post-processing of a downloaded episode and free its worker."""
+    if journal is not None:
+        journal.record(job.key, state="downloaded", player=job.player, file=job.file)
+    download_progress.update(
+        cast(TaskID, job.task_id), episode_name=f"{job.episode.warpped.name} (post-processing)"
+    )
+    if reporter.headless:
+        reporter.emit({"event": "post-processing", "episode": job.episode.warpped.name})
+
+    def done(filepath: str | None, error: Exception | None) -> None:
+        if error is not None:
+            logger.error(f"Post-processing of {job.episode.warpped.name} failed: {error}")
+            if journal is not None:
+                journal.record(job.key, state="failed")
+        elif journal is not None:
+            journal.record(job.key, state="done", player=job.player, file=filepath or job.file)
+        _finish(cast(TaskID, job.task_id))
+
+    params = {k: v for k, v in job.option.items() if k not in ("progress_hooks", "postprocessor_hooks")}
+    post_stage.submit(params, deferred, done)
 
 
 def multi_download(
@@ -196,25 +793,113 @@ def multi_download(
     max_retry_time: int = 1024,
     format: str = "",
     format_sort: str = "",
+    resume: bool = True,
+    headless: bool | None = None,
+    probe: bool = False,
 ) -> None:
     """
     Not sure if you can use this function multiple times
+
+    concurrent_downloads["host"] limits the downloads running at once on a
+    single player host (half of "video" by default, at least one), so the
+    other workers stay free for episodes on other hosts.
+
+    With resume, progress is journaled in `path`: a re-run skips the episodes
+    already downloaded and tries first the player that was last used for the
+    others, so yt-dlp can continue their partial files.
+
+    In headless mode (by default when the console is not a terminal),
+    progress is printed as JSON lines instead of the live display.
+
+    With probe, the hosts of all candidate players are measured in parallel
+    before starting, and each episode tries its fastest mirrors first.
+
+    Merges and remuxes run in a separate stage of concurrent_downloads["postprocess"]
+    processes (one per CPU by default), so download workers move on to the next
+    episode as soon as their files are fetched.
     """
+    workers = concurrent_downloads.get("video", 1)
+    scheduler = HostScheduler(concurrent_downloads.get("host", max(1, workers // 2)))
+    reporter.headless = not console.is_terminal if headless is None else headless
+    reporter.on_bytes = scheduler.record
+    reporter.start()
     total_progress.add_task("Downloaded", total=len(episodes))
-    with Live(progress, console=console):
-        with ThreadPoolExecutor(
-            max_workers=concurrent_downloads.get("video", 1)
-        ) as executor:
-            for episode in episodes:
-                executor.submit(
-                    download,
-                    episode,
+    post_stage = PostProcessingStage(concurrent_downloads.get("postprocess", os.cpu_count() or 1))
+
+    journal = None
+    if resume:
+        path.expanduser().mkdir(parents=True, exist_ok=True)
+        journal = DownloadJournal(path.expanduser() / ".download_journal.jsonl")
+
+    candidates: list[tuple[int, EpisodeWithExtraInfo, str, list[str], dict]] = []
+    for index, episode in enumerate(episodes):
+        if not any(episode.warpped.languages.values()):
+            logger.error("No player available")
+            continue
+
+        key = str(_full_path(episode, path, episode_path))
+        if journal is not None and journal.completed(key):
+            total_progress.update(TaskID(0), advance=1)
+            continue
+
+        languages = {language: list(players) for language, players in episode.warpped.languages.items()}
+        players = list(
+            episode.warpped.consume_player(
+                prefer_languages, players_config.prefers, players_config.bans
+            )
+        )
+        candidates.append((index, episode, key, players, languages))
+
+    if probe:
+        # One round of probes for the whole batch, one per host
+        player_probe.probe([player for *_, players, _ in candidates for player in players])
+
+    for index, episode, key, players, languages in candidates:
+        if probe:
+            players = player_probe.order(players, languages)
+        previous = journal.get(key).get("player") if journal is not None else None
+        if previous in players:
+            players.remove(previous)
+            players.insert(0, previous)
+        scheduler.add(_Job(index, episode, iter(players), key))
+
+    def worker() -> None:
+        while (acquired := scheduler.acquire()) is not None:
+            job, host = acquired
+            requeue = False
+            try:
+                requeue = _run_job(
+                    job,
+                    host,
+                    scheduler,
+                    journal,
+                    post_stage,
                     path,
                     episode_path,
-                    prefer_languages,
-                    players_config,
                     concurrent_downloads.get("fragment", 1),
                     max_retry_time,
                     format,
                     format_sort,
                 )
+            except Exception:
+                logger.exception(f"Download of {job.episode.warpped.name} failed")
+            finally:
+                scheduler.release(job, host, requeue)
+
+    with nullcontext() if reporter.headless else Live(Group(progress, scheduler), console=console):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.submit(worker)
+        post_stage.close()
+
+    if reporter.headless:
+        reporter.emit(
+            {
+                "event": "completed",
+                "downloaded": int(total_progress.tasks[0].completed),
+                "total": len(episodes),
+                "http": http_client.stats(),
+            }
+        )
+    else:
+        logger.debug(f"HTTP client: {http_client.stats()}")
@@ -0,0 +1,290 @@
+# extract_workers.py
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import time
+from collections import Counter
+from threading import Condition, Lock
+
+from yt_dlp.utils import DownloadError
+
+logger = logging.getLogger(__name__)
+
+def compact_result(info, domain):
+    """Résultat renvoyé au client, sans le reste du dict d'info de yt-dlp"""
+    video_url = info.get("url")
+    if not video_url and info.get("formats"):
+        # Chercher le meilleur format
+        for fmt in reversed(info["formats"]):
+            if fmt.get("url"):
+                video_url = fmt["url"]
+                break
+
+    if not video_url:
+        return None
+    return {
+        "success": True,
+        "url": video_url,
+        "is_hls": ".m3u8" in video_url,
+        "title": info.get("title", "Video"),
+        "duration": info.get("duration"),
+        "thumbnail": info.get("thumbnail"),
+        "site": domain
+    }
+
+def run_extraction(url, ydl_opts, domain):
+    """extract_info avec une instance du pool YoutubeDL, réduit au résultat compact"""
+    from ydl_pool import ydl_pool
+
+    with ydl_pool.checkout(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return compact_result(info, domain) if info else None
+
+def rss_kb():
+    """Mémoire résidente actuelle du processus, en Ko"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class WorkerCrashed(Exception):
+    """Le processus d'extraction s'est arrêté au milieu d'une extraction"""
+
+class WorkerError(Exception):
+    """Exception levée dans le processus d'extraction, hors échec yt-dlp"""
+
+class ExtractionProcess:
+    """Un processus d'extraction de longue durée, une requête JSON par ligne"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.jobs = 0
+        self.rss_kb = 0
+        self.started = time.time()
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def call(self, url, ydl_opts, domain, timeout):
+        """Exécute une extraction dans le processus et retourne son résultat"""
+        try:
+            self.process.stdin.write(json.dumps({"url": url, "options": ydl_opts, "domain": domain}) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.kill()
+            raise WorkerCrashed(f"Extraction worker {self.pid} is gone (exit code {self.process.returncode})")
+
+        # Une extraction bloquée au-delà du timeout condamne le processus
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            self.kill()
+            raise TimeoutError(f"Extraction worker {self.pid} timed out after {timeout}s")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerCrashed(f"Extraction worker {self.pid} crashed (exit code {self.process.wait()})")
+
+        self.jobs += 1
+        response = json.loads(line)
+        self.rss_kb = response.get("rss_kb", 0)
+        if "error" in response:
+            if response.get("type") == "DownloadError":
+                raise DownloadError(response["error"])
+            raise WorkerError(response["error"])
+        return response["result"]
+
+    def stop(self, timeout=5):
+        """Fin de stdin : le processus termine sa boucle et sort"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+class ExtractionWorkers:
+    """Pool de processus d'extraction isolés du worker web
+
+    Les dicts d'info de yt-dlp et la fragmentation du tas restent dans ces
+    processus : seul le résultat compact revient. Un processus est remplacé
+    après max_jobs extractions ou quand sa mémoire dépasse max_rss_mb, et
+    redémarré s'il plante, sans toucher au worker web.
+    """
+
+    def __init__(self, processes=4, max_jobs=200, max_rss_mb=300, timeout=60):
+        self.processes = processes
+        self.max_jobs = max_jobs
+        self.max_rss_kb = max_rss_mb * 1024
+        self.timeout = timeout
+        self.idle = []
+        self.busy = set()
+        # Places réservées par des processus en cours de démarrage
+        self.spawning = 0
+        self.cond = Condition(Lock())
+        self.pid = None
+        self.jobs = 0
+        self.recycled = Counter()
+
+    def reset_after_fork(self):
+        """Les processus créés avant un fork appartiennent au parent"""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.idle = []
+            self.busy = set()
+            self.spawning = 0
+
+    def acquire(self, deadline=None):
+        """Processus libre, démarré hors du verrou si besoin ; TimeoutError à l'échéance"""
+        with self.cond:
+            self.reset_after_fork()
+            while not self.idle and len(self.busy) + self.spawning >= self.processes:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No extraction worker available before the deadline")
+                self.cond.wait(remaining)
+            worker = self.idle.pop() if self.idle else None
+            if worker is None:
+                self.spawning += 1
+            else:
+                self.busy.add(worker)
+
+        if worker is None:
+            try:
+                worker = ExtractionProcess()
+            finally:
+                with self.cond:
+                    self.spawning -= 1
+                    if worker is not None:
+                        self.busy.add(worker)
+                    else:
+                        self.cond.notify()
+            return worker
+
+        # Mort pendant qu'il attendait (OOM killer...) : remplacé avant usage
+        if worker.process.poll() is not None:
+            logger.warning(f"Extraction worker {worker.pid} exited while idle (exit code {worker.process.returncode})")
+            replacement = ExtractionProcess()
+            with self.cond:
+                self.recycled["exited"] += 1
+                self.busy.discard(worker)
+                self.busy.add(replacement)
+            worker = replacement
+        return worker
+
+    def release(self, worker, reason=None):
+        """Rend le processus au pool, ou le remplace s'il doit être recyclé"""
+        if reason is None:
+            if worker.jobs >= self.max_jobs:
+                reason = "jobs"
+            elif self.max_rss_kb and worker.rss_kb > self.max_rss_kb:
+                reason = "rss"
+
+        # Le remplaçant importe yt-dlp pendant que la place est libre ; démarré
+        # hors du verrou, la place restant comptée tant qu'il n'est pas prêt
+        replacement = ExtractionProcess() if reason is not None else None
+        with self.cond:
+            self.busy.discard(worker)
+            if reason is None:
+                self.idle.append(worker)
+            else:
+                self.recycled[reason] += 1
+                self.idle.append(replacement)
+            self.cond.notify()
+
+        if reason in ("jobs", "rss"):
+            logger.info(f"Recycling extraction worker {worker.pid} ({reason}: {worker.jobs} jobs, {worker.rss_kb // 1024} MB)")
+            worker.stop()
+
+    def run(self, url, ydl_opts, domain, deadline=None):
+        """Extraction dans un processus du pool, relancée une fois sur un processus neuf s'il plante"""
+        for attempt in range(2):
+            worker = self.acquire(deadline)
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.time())
+                if timeout <= 0:
+                    self.release(worker)
+                    raise TimeoutError("Extraction deadline exceeded")
+            try:
+                result = worker.call(url, ydl_opts, domain, timeout)
+            except WorkerCrashed as e:
+                logger.warning(str(e))
+                self.release(worker, "crash")
+                if attempt:
+                    raise
+                continue
+            except TimeoutError:
+                self.release(worker, "timeout")
+                raise
+            except BaseException:
+                self.release(worker)
+                raise
+            with self.cond:
+                self.jobs += 1
+            self.release(worker)
+            return result
+
+    def close(self):
+        with self.cond:
+            workers = self.idle + list(self.busy)
+            self.idle = []
+        for worker in workers:
+            worker.stop()
+
+    def stats(self):
+        with self.cond:
+            workers = self.idle + list(self.busy)
+            return {
+                "enabled": True,
+                "processes": self.processes,
+                "busy": len(self.busy),
+                "jobs": self.jobs,
+                "recycled": dict(self.recycled),
+                "workers": [{"pid": w.pid, "jobs": w.jobs, "rss_mb": round(w.rss_kb / 1024, 1)} for w in workers]
+            }
+
+def create_extraction_workers(timeout=60):
+    """Pool de EXTRACT_PROCESSES processus, ou None (extraction dans le worker web) si 0"""
+    processes = int(os.environ.get("EXTRACT_PROCESSES", 0))
+    if processes <= 0:
+        return None
+    return ExtractionWorkers(
+        processes=processes,
+        max_jobs=int(os.environ.get("EXTRACT_PROCESS_MAX_JOBS", 200)),
+        max_rss_mb=int(os.environ.get("EXTRACT_PROCESS_MAX_RSS_MB", 300)),
+        timeout=timeout
+    )
+
+def main():
+    """Boucle du processus d'extraction : une requête JSON par ligne sur stdin"""
+    # Le protocole garde sa propre copie de stdout ; tout affichage part sur stderr
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            response = {"result": run_extraction(request["url"], request["options"], request["domain"])}
+        except Exception as e:
+            response = {"error": str(e), "type": type(e).__name__}
+        response["rss_kb"] = rss_kb()
+        out.write(json.dumps(response) + "\n")
+
+if __name__ == "__main__":
+    main()
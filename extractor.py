@@ -1,9 +1,10 @@
 # extractor.py
-import yt_dlp
-import requests
-import re
 import time
 import random
+from urllib.parse import urlparse
+
+from ydl_pool import ydl_pool
+from sites import registry
 
 def extract(url, try_yt_dlp=True):
     """
@@ -12,31 +13,26 @@ def extract(url, try_yt_dlp=True):
     if not try_yt_dlp:
         return None
     
-    # Stratégie selon le site
-    if "sibnet.ru" in url:
-        return extract_sibnet(url)
-    elif "vk.com" in url:
-        return extract_vk(url)
-    elif any(site in url for site in ["vidmoly.net", "myvi.top", "myvi.tv"]):
-        return extract_generic_with_referer(url)
-    else:
-        return extract_generic(url)
+    # Stratégie selon le site, résolue par suffixe d'hôte
+    site = registry.lookup(url)
+    handler = SITE_HANDLERS.get(site.name, extract_generic)
+    
+    started = time.monotonic()
+    result = handler(url)
+    registry.record(site, "direct", bool(result), time.monotonic() - started)
+    return result
 
 def extract_sibnet(url):
     """Extraction spécifique pour Sibnet"""
     try:
-        ydl_opts = {
+        ydl_opts = registry.sites["sibnet"].options({
             "quiet": True,
-            "format": "mp4/best",
             "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Referer": "https://video.sibnet.ru/",
-                "Origin": "https://video.sibnet.ru"
-            },
-            "socket_timeout": 30
-        }
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            }
+        }, consumer="extractor")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.checkout(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             return info.get("url")
     except:
@@ -45,16 +41,9 @@ def extract_sibnet(url):
 def extract_vk(url):
     """Extraction spécifique pour VK"""
     try:
-        ydl_opts = {
-            "quiet": True,
-            "format": "best[height<=720]",  # Limite la qualité
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (compatible; VK App)",
-                "Referer": "https://vk.com/"
-            }
-        }
+        ydl_opts = registry.sites["vk"].options({"quiet": True}, consumer="extractor")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.checkout(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             return info.get("url")
     except:
@@ -63,18 +52,17 @@ def extract_vk(url):
 def extract_generic_with_referer(url):
     """Extraction générique avec referer"""
     try:
-        domain = url.split('/')[2]
-        ydl_opts = {
+        domain = urlparse(url).hostname or ""
+        ydl_opts = registry.lookup(domain).options({
             "quiet": True,
             "format": "mp4/best",
             "http_headers": {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Referer": f"https://{domain}/",
-                "Accept": "*/*"
+                "Referer": f"https://{domain}/"
             }
-        }
+        }, domain, "extractor")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.checkout(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             return info.get("url")
     except:
@@ -91,8 +79,16 @@ def extract_generic(url):
             "socket_timeout": 20
         }
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.checkout(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             return info.get("url")
     except:
         return None
+
+# Fonction d'extraction par site du registre, extract_generic par défaut
+SITE_HANDLERS = {
+    "sibnet": extract_sibnet,
+    "vk": extract_vk,
+    "vidmoly": extract_generic_with_referer,
+    "myvi": extract_generic_with_referer,
+}
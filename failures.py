@@ -0,0 +1,205 @@
+# failures.py
+import os
+import re
+import time
+from threading import Lock
+
+# Motifs des messages d'erreur, du plus définitif au moins définitif ; appliqués
+# sans les URLs (un identifiant de vidéo contient facilement "403" ou "geo")
+REASONS = (
+    ("not_found", re.compile(
+        r"\bHTTP Error (?:404|410)\b|\bnot found\b|\bvideo (?:is )?unavailable\b|\bprivate video\b"
+        r"|\b(?:has been|was) (?:removed|deleted)\b|\bdoes not exist\b|\bno longer available\b", re.I)),
+    ("rate_limited", re.compile(r"\bHTTP Error 429\b|\btoo many requests\b|\brate[- ]?limit", re.I)),
+    ("blocked", re.compile(
+        r"\bHTTP Error 403\b|\bforbidden\b|\bsign in to confirm\b|\bgeo[- ]?restrict|\bavailable in your country\b"
+        r"|\bcaptcha\b|\bblocked\b", re.I)),
+    ("unsupported", re.compile(r"\bunsupported url\b|\bno video formats\b", re.I)),
+    # Erreurs serveur passagères : backoff court, jamais considérées comme définitives
+    ("server_error", re.compile(
+        r"\bHTTP Error 5\d\d\b|\bservice unavailable\b|\bbad gateway\b|\binternal server error\b", re.I)),
+    ("timeout", re.compile(r"\btimed? ?out\b|\btimeout\b", re.I)),
+)
+
+URL = re.compile(r"\b[a-z][a-z0-9+.-]*://\S+", re.I)
+
+# Raisons qui concernent tout le domaine plutôt qu'une seule vidéo ; "unknown"
+# (aucun motif reconnu, ou stratégies sans résultat) reste propre à l'URL
+DOMAIN_REASONS = {"rate_limited", "blocked", "timeout"}
+
+# Messages de référence du classement, vérifiés par python failures.py
+CLASSIFY_EXAMPLES = (
+    ("HTTP Error 500 for https://video.sibnet.ru/shell.php?videoid=4031234", "server_error"),
+    ("ERROR: Unsupported URL: https://x.com/geography", "unsupported"),
+    ("HTTP Error 503: Service Unavailable", "server_error"),
+    ("ERROR: [youtube] abc: Video unavailable", "not_found"),
+    ("Unable to download webpage: HTTP Error 404: Not Found", "not_found"),
+    ("Unable to download webpage: HTTP Error 403: Forbidden", "blocked"),
+    ("The uploader has not made this video available in your country", "blocked"),
+    ("This video is geo-restricted", "blocked"),
+    ("HTTP Error 429: Too Many Requests", "rate_limited"),
+    ("Read timed out. (read timeout=30)", "timeout"),
+    ("https://vidmoly.to/embed-404notfound.html: Connection refused", "unknown"),
+)
+
+def classify(errors):
+    """Raison d'échec la plus définitive parmi les erreurs des stratégies"""
+    messages = [URL.sub("", error) for error in errors]
+    for reason, pattern in REASONS:
+        if any(pattern.search(message) for message in messages):
+            return reason
+    return "unknown"
+
+class ExtractionFailed(Exception):
+    """Toutes les stratégies ont échoué, avec la raison classée et le délai avant nouvel essai"""
+
+    def __init__(self, reason, retry_after=0, cached=False, scope="url"):
+        super().__init__(f"All extraction methods failed ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.cached = cached
+        self.scope = scope
+
+class Backoff:
+    """Échecs consécutifs d'une clé, et fin de la période pendant laquelle ne pas réessayer"""
+
+    __slots__ = ("failures", "reason", "until", "updated")
+
+    def __init__(self):
+        self.failures = 0
+        self.reason = None
+        self.until = 0.0
+        self.updated = 0.0
+
+class FailureCache:
+    """Cache négatif par URL et par domaine, avec durée exponentielle
+
+    Chaque échec consécutif double la durée pendant laquelle l'URL est
+    refusée sans extraction, jusqu'à max_ttl ; un succès efface l'historique.
+    Un domaine est refusé en bloc quand domain_threshold URLs distinctes y
+    échouent pour une raison non spécifique à la vidéo dans la fenêtre.
+    """
+
+    def __init__(self, ttl=30, max_ttl=1800, domain_threshold=5, domain_window=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.domain_threshold = domain_threshold
+        self.domain_window = domain_window
+        self.max_entries = max_entries
+        self.urls = {}
+        self.domains = {}
+        # Échecs récents par domaine : {domaine: {url: instant}}
+        self.recent = {}
+        self.lock = Lock()
+        self.hits = 0
+        self.recorded = 0
+
+    def backoff(self, failures):
+        return min(self.ttl * 2 ** (failures - 1), self.max_ttl)
+
+    def check(self, url, domain):
+        """Lève ExtractionFailed si l'URL ou son domaine est en période de backoff"""
+        if not self.ttl:
+            return
+        now = time.time()
+        with self.lock:
+            for scope, entries, key in (("domain", self.domains, domain), ("url", self.urls, url)):
+                entry = entries.get(key)
+                if entry is not None and entry.until > now:
+                    self.hits += 1
+                    raise ExtractionFailed(entry.reason, round(entry.until - now, 1), cached=True, scope=scope)
+
+    def record(self, url, domain, reason):
+        """Enregistre un échec et retourne la durée du backoff appliqué"""
+        if not self.ttl:
+            return 0
+        now = time.time()
+        with self.lock:
+            self.recorded += 1
+            if len(self.urls) >= self.max_entries and url not in self.urls:
+                self.prune(now)
+            ttl = self.bump(self.urls, url, reason, now)
+
+            if reason in DOMAIN_REASONS:
+                recent = self.recent.setdefault(domain, {})
+                recent[url] = now
+                for key, at in list(recent.items()):
+                    if now - at > self.domain_window:
+                        del recent[key]
+                if len(recent) >= self.domain_threshold:
+                    recent.clear()
+                    self.bump(self.domains, domain, reason, now)
+        return ttl
+
+    def bump(self, entries, key, reason, now):
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = Backoff()
+        # Pas de nouvel échec depuis longtemps : repartir de la durée de base
+        if now - entry.updated > self.max_ttl * 2:
+            entry.failures = 0
+        entry.failures += 1
+        entry.reason = reason
+        entry.updated = now
+        ttl = self.backoff(entry.failures)
+        entry.until = now + ttl
+        return ttl
+
+    def success(self, url, domain):
+        """Un succès efface l'historique de l'URL et du domaine"""
+        with self.lock:
+            self.urls.pop(url, None)
+            if domain in self.domains or domain in self.recent:
+                self.domains.pop(domain, None)
+                self.recent.pop(domain, None)
+
+    def forget(self, url, domain=None):
+        """Oublie l'URL (et son domaine) avant une nouvelle vérification forcée"""
+        with self.lock:
+            self.urls.pop(url, None)
+            if domain is not None:
+                self.domains.pop(domain, None)
+
+    def prune(self, now):
+        """Retire les entrées dont l'historique ne sert plus"""
+        for entries in (self.urls, self.domains):
+            for key in [k for k, e in entries.items() if now - e.updated > self.max_ttl * 2]:
+                del entries[key]
+        # Encore plein : retirer les entrées dont le backoff est terminé
+        if len(self.urls) >= self.max_entries:
+            for key in [k for k, e in self.urls.items() if e.until <= now]:
+                del self.urls[key]
+
+    def clear(self):
+        with self.lock:
+            self.urls.clear()
+            self.domains.clear()
+            self.recent.clear()
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            return {
+                "enabled": bool(self.ttl),
+                "urls": sum(1 for e in self.urls.values() if e.until > now),
+                "domains": {
+                    domain: {"reason": e.reason, "failures": e.failures, "retry_after": round(e.until - now, 1)}
+                    for domain, e in self.domains.items() if e.until > now
+                },
+                "hits": self.hits,
+                "recorded": self.recorded
+            }
+
+def create_failure_cache():
+    """Durées configurées par NEGATIVE_CACHE_TTL (0 : désactivé) et NEGATIVE_CACHE_MAX_TTL"""
+    return FailureCache(
+        ttl=float(os.environ.get("NEGATIVE_CACHE_TTL", 30)),
+        max_ttl=float(os.environ.get("NEGATIVE_CACHE_MAX_TTL", 1800)),
+        domain_threshold=int(os.environ.get("NEGATIVE_CACHE_DOMAIN_THRESHOLD", 5))
+    )
+
+if __name__ == "__main__":
+    for message, expected in CLASSIFY_EXAMPLES:
+        reason = classify([message])
+        assert reason == expected, f"{message!r}: {reason}, expected {expected}"
+    print(f"{len(CLASSIFY_EXAMPLES)} messages classified as expected")
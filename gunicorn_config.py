@@ -1,4 +1,5 @@
 import os
+import sys
 import multiprocessing
 
 # Binding
@@ -6,16 +7,32 @@ bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
 
 # Workers - moins de workers pour démarrage plus rapide
 workers = min(2, multiprocessing.cpu_count())
-worker_class = "sync"  # Plus simple et rapide que gevent/eventlet
-worker_connections = 1000
+
+# SERVER_MODE=sync : une requête à la fois par worker (défaut)
+# SERVER_MODE=threads : workers gthread, chaque requête dans un thread léger ; les
+# attentes (pool d'extraction, rate limiting, cobalt, proxies, cache) n'occupent
+# plus le processus, et yt-dlp reste borné par EXTRACT_WORKERS.
+# gevent n'est pas proposé : son monkey-patching transformerait le pool
+# d'extraction en greenlets, et les appels bloquants de yt-dlp figeraient la boucle.
+server_mode = os.environ.get("SERVER_MODE", "sync")
+if server_mode == "threads":
+    worker_class = "gthread"
+    threads = int(os.environ.get("THREADS", 100))
+    # Chaque thread peut attendre une extraction : la file du pool doit les accueillir
+    os.environ.setdefault("EXTRACT_QUEUE", str(threads))
+else:
+    worker_class = "sync"  # Plus simple et rapide que gevent/eventlet
+# Connexions ouvertes par worker (keep-alive compris), ignoré en mode sync
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 1000))
 
 # Timeout - important pour éviter les 502
 timeout = 120  # 2 minutes pour les extractions longues
 graceful_timeout = 30
 keepalive = 5
 
-# Preloading - désactivé pour démarrage plus rapide
-preload_app = False
+# Preloading - PRELOAD_APP=1 charge Flask, yt-dlp et ses extracteurs une seule fois
+# dans le master ; les workers forkés les partagent en copy-on-write et démarrent à chaud
+preload_app = os.environ.get("PRELOAD_APP") == "1"
 
 # Logging
 accesslog = "-"
@@ -32,6 +49,9 @@ max_requests_jitter = 50
 # Hook de démarrage
 def on_starting(server):
     server.log.info("Starting Gunicorn server...")
+    # Métriques de l'exécution précédente : repartir de zéro
+    from metrics import METRICS_DIR, reset_directory
+    reset_directory(METRICS_DIR)
 
 def worker_int(worker):
     worker.log.info("Worker received INT or QUIT signal")
@@ -39,6 +59,12 @@ def worker_int(worker):
 def pre_fork(server, worker):
     server.log.info(f"Worker spawned (pid: {worker.pid})")
 
+def post_fork(server, worker):
+    # Avec preload_app, les threads de fond démarrent dans chaque worker après le fork
+    app_module = sys.modules.get("server")
+    if app_module is not None and hasattr(app_module, "start_background_tasks"):
+        app_module.start_background_tasks()
+
 def when_ready(server):
     server.log.info("Server is ready. Spawning workers...")
 
@@ -49,8 +75,6 @@ def on_exit(server):
 if os.environ.get("DYNO"):
     # Heroku
     workers = 1
-    preload_app = False
 elif os.environ.get("RENDER"):
     # Render
     workers = 1
-    preload_app = False
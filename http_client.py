@@ -0,0 +1,145 @@
+# http_client.py
+import logging
+import os
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class PooledHTTPClient:
+    """Client HTTP partagé entre threads : keep-alive, HTTP/2 si disponible, limite par hôte"""
+
+    def __init__(self, max_connections=50, max_per_host=8, keepalive_expiry=30, timeout=15, event_hooks=None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.event_hooks = event_hooks
+        self.lock = Lock()
+        self.host_slots = {}
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+        self.slot_timeouts = 0
+        self.pid = None
+        self._client = None
+
+    @property
+    def client(self):
+        # Les connexions ouvertes par le master ne doivent pas servir après un fork
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self._client = httpx.Client(
+                        http2=HTTP2_AVAILABLE,
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections,
+                            keepalive_expiry=self.keepalive_expiry
+                        ),
+                        timeout=self.timeout,
+                        follow_redirects=True,
+                        event_hooks=self.event_hooks
+                    )
+                    self.host_slots = {}
+                    self.pid = os.getpid()
+        return self._client
+
+    def slot_timeout(self, timeout):
+        """Attente maximale d'un créneau d'hôte : celle d'une connexion du pool pour cette requête"""
+        if isinstance(timeout, httpx.Timeout):
+            return timeout.pool
+        return timeout
+
+    @contextmanager
+    def host_slot(self, host, timeout=None):
+        """Limite le nombre de connexions simultanées vers un même hôte
+
+        Lève httpx.PoolTimeout si aucun créneau ne se libère en timeout secondes.
+        """
+        with self.lock:
+            slots = self.host_slots.get(host)
+            if slots is None:
+                slots = self.host_slots[host] = BoundedSemaphore(self.max_per_host)
+        if not slots.acquire(timeout=timeout):
+            with self.lock:
+                self.slot_timeouts += 1
+            raise httpx.PoolTimeout(f"No connection slot for {host} within {timeout}s")
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def trace(self, event_name, info):
+        # Chaque nouvelle connexion TCP ; les requêtes restantes ont réutilisé une connexion
+        if event_name == "connection.connect_tcp.complete":
+            with self.lock:
+                self.connections += 1
+
+    def request(self, method, url, **kwargs):
+        client = self.client
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = self.trace
+        with self.host_slot(urlparse(url).hostname or "", self.slot_timeout(kwargs.get("timeout", self.timeout))):
+            try:
+                response = client.request(method, url, extensions=extensions, **kwargs)
+            except httpx.HTTPError:
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self.lock:
+                    self.requests += 1
+        return response
+
+    @contextmanager
+    def stream(self, method, url, **kwargs):
+        """Réponse lue par morceaux ; le créneau de l'hôte reste pris jusqu'à la fin de la lecture"""
+        client = self.client
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = self.trace
+        with self.host_slot(urlparse(url).hostname or "", self.slot_timeout(kwargs.get("timeout", self.timeout))):
+            try:
+                with client.stream(method, url, extensions=extensions, **kwargs) as response:
+                    yield response
+            except httpx.HTTPError:
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self.lock:
+                    self.requests += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        with self.lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "http2": HTTP2_AVAILABLE,
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "connections_reused": reused,
+                "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+                "errors": self.errors,
+                "slot_timeouts": self.slot_timeouts
+            }
+
+# Client partagé pour tous les appels sortants du serveur
+http_client = PooledHTTPClient(
+    max_connections=int(os.environ.get("HTTP_MAX_CONNECTIONS", 50)),
+    max_per_host=int(os.environ.get("HTTP_MAX_PER_HOST", 8))
+)
@@ -0,0 +1,183 @@
+# jobs.py
+import json
+import os
+import secrets
+import sqlite3
+import tempfile
+import time
+from threading import Condition, Lock, local
+
+class MemoryJobs:
+    """États des jobs dans la mémoire du worker"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = Lock()
+
+    def put(self, job_id, job):
+        with self.lock:
+            self.jobs[job_id] = job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, now):
+        with self.lock:
+            for job_id in [k for k, job in self.jobs.items() if job["expires_at"] <= now]:
+                del self.jobs[job_id]
+
+    def count(self, now):
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job["expires_at"] > now)
+
+class SQLiteJobs:
+    """États des jobs dans une base partagée : n'importe quel worker répond au polling"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = local()
+        self.pid = os.getpid()
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def connection(self):
+        """Une connexion par thread, jamais héritée du master après un fork"""
+        if self.pid != os.getpid():
+            self.local = local()
+            self.pid = os.getpid()
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def put(self, job_id, job):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO jobs (id, value, expires_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(job), job["expires_at"])
+        )
+
+    def get(self, job_id):
+        row = self.connection().execute(
+            "SELECT value FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge(self, now):
+        self.connection().execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+
+    def count(self, now):
+        return self.connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE expires_at > ?", (now,)
+        ).fetchone()[0]
+
+class JobStore:
+    """Jobs d'extraction asynchrones : créés en attente, terminés par le pool
+
+    Le client reçoit l'identifiant tout de suite et interroge le job (ou
+    s'abonne à ses événements) au lieu de garder une requête ouverte pendant
+    toute l'extraction. Un job encore en attente après son échéance est
+    considéré comme expiré.
+    """
+
+    def __init__(self, backend, ttl=600, poll_interval=0.5):
+        self.backend = backend
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        # Réveille les abonnés SSE du worker dès qu'un job se termine
+        self.changed = Condition()
+        self.lock = Lock()
+        self.created = 0
+        self.completed = 0
+        self.failed = 0
+
+    def create(self, url, deadline):
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        self.backend.put(job_id, {
+            "id": job_id,
+            "url": url,
+            "status": "pending",
+            "created_at": now,
+            "deadline": deadline,
+            "expires_at": deadline + self.ttl
+        })
+        with self.lock:
+            self.created += 1
+            # Purge périodique des jobs expirés
+            if self.created % 100 == 0:
+                self.backend.purge(now)
+        return job_id
+
+    def finish(self, job_id, result=None, error=None):
+        """Enregistre le résultat brut de l'extraction, ou l'erreur {"error", "status", ...}"""
+        job = self.backend.get(job_id)
+        if job is None:
+            return
+        job["finished_at"] = time.time()
+        job["expires_at"] = job["finished_at"] + self.ttl
+        if error is None:
+            job["status"] = "done"
+            job["result"] = result
+        else:
+            job["status"] = "failed"
+            job["error"] = error
+        self.backend.put(job_id, job)
+        with self.lock:
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        with self.changed:
+            self.changed.notify_all()
+
+    def get(self, job_id):
+        """État courant du job, ou None s'il est inconnu ou expiré"""
+        job = self.backend.get(job_id)
+        now = time.time()
+        if job is None or job["expires_at"] <= now:
+            return None
+        if job["status"] == "pending" and now >= job["deadline"]:
+            job["status"] = "failed"
+            job["error"] = {"error": "Extraction deadline exceeded", "status": 408}
+        return job
+
+    def wait(self, job_id, timeout):
+        """Attend la fin du job au plus timeout secondes et retourne son état
+
+        Les jobs de ce worker réveillent l'attente dès leur fin ; ceux d'un
+        autre worker sont relus toutes les poll_interval secondes.
+        """
+        end = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = end - time.monotonic()
+            if job is None or job["status"] != "pending" or remaining <= 0:
+                return job
+            with self.changed:
+                self.changed.wait(min(remaining, self.poll_interval))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "backend": "sqlite" if isinstance(self.backend, SQLiteJobs) else "memory",
+                "active": self.backend.count(time.time()),
+                "created": self.created,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+
+def create_job_store():
+    """Jobs partagés entre workers si JOBS_DB_PATH n'est pas vide, sinon par worker"""
+    path = os.environ.get(
+        "JOBS_DB_PATH",
+        os.path.join(tempfile.gettempdir(), "video_extractor_jobs.db")
+    )
+    backend = SQLiteJobs(path) if path else MemoryJobs()
+    return JobStore(backend, ttl=int(os.environ.get("JOBS_TTL", 600)))
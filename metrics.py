@@ -0,0 +1,255 @@
+# metrics.py
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes de latence, en secondes
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+def render_labels(labels):
+    if not labels:
+        return ""
+    return ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in sorted(labels.items())
+    )
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = render_labels(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, value, **labels):
+        key = render_labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: {"counts": list(counts), "sum": total, "count": count}
+                    for key, (counts, total, count) in self.values.items()}
+
+class Gauge:
+    """Valeur lue au moment de l'export, via une fonction"""
+
+    def __init__(self, name, help, fn):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def snapshot(self):
+        try:
+            return {"": float(self.fn())}
+        except Exception:
+            return {}
+
+class Metrics:
+    """Métriques en mémoire par worker, agrégées entre workers via un fichier par processus
+
+    Chaque worker écrit périodiquement son instantané dans METRICS_DIR ; l'export
+    additionne les fichiers de tous les workers. Les compteurs des workers
+    terminés sont conservés dans une archive, leurs jauges sont ignorées.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.flusher_pid = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Metrics directory unavailable, per-worker metrics only: {e}")
+                self.directory = None
+
+    def counter(self, name, help):
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name, help, fn):
+        return self.metrics.setdefault(name, Gauge(name, help, fn))
+
+    def snapshot(self):
+        return {
+            name: {"type": type(metric).__name__.lower(), "values": metric.snapshot()}
+            for name, metric in self.metrics.items()
+        }
+
+    def flush(self):
+        """Écrit l'instantané de ce processus, de manière atomique"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def start_flusher(self):
+        """Thread d'écriture périodique, un par worker (à lancer après le fork)"""
+        if not self.directory or self.flusher_pid == os.getpid():
+            return
+        self.flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.warning(f"Metrics flush failed: {e}")
+
+        Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def alive(pid):
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    @staticmethod
+    def merge(total, snapshot, with_gauges=True):
+        for name, metric in snapshot.items():
+            kind = metric["type"]
+            if kind == "gauge" and not with_gauges:
+                continue
+            target = total.setdefault(name, {"type": kind, "values": {}})["values"]
+            for key, value in metric["values"].items():
+                if kind == "histogram":
+                    entry = target.setdefault(key, {"counts": [0] * len(value["counts"]), "sum": 0.0, "count": 0})
+                    entry["counts"] = [a + b for a, b in zip(entry["counts"], value["counts"])]
+                    entry["sum"] += value["sum"]
+                    entry["count"] += value["count"]
+                else:
+                    target[key] = target.get(key, 0) + value
+
+    def collect(self):
+        """Instantané agrégé de tous les workers"""
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush()
+        archive_path = os.path.join(self.directory, "archive.json")
+        with open(os.path.join(self.directory, "lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                archive = {}
+                if os.path.exists(archive_path):
+                    with open(archive_path) as f:
+                        archive = json.load(f)
+
+                total = {}
+                archived = False
+                for path in glob.glob(os.path.join(self.directory, "[0-9]*.json")):
+                    pid = int(os.path.basename(path).split(".")[0])
+                    try:
+                        with open(path) as f:
+                            snapshot = json.load(f)
+                    except (OSError, ValueError):
+                        continue
+                    if self.alive(pid):
+                        self.merge(total, snapshot)
+                    else:
+                        # Worker terminé : ses compteurs rejoignent l'archive
+                        self.merge(archive, snapshot, with_gauges=False)
+                        os.remove(path)
+                        archived = True
+
+                if archived:
+                    fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(archive, f)
+                    os.replace(tmp, archive_path)
+                self.merge(total, archive)
+                return total
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def render(self):
+        """Export au format texte Prometheus"""
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            kind = type(metric).__name__.lower()
+            values = collected.get(name, {}).get("values", {})
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values.items()):
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), value["counts"]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        labels = f'{key},le="{le}"' if key else f'le="{le}"'
+                        lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+                    suffix = f"{{{key}}}" if key else ""
+                    lines.append(f"{name}_sum{suffix} {value['sum']}")
+                    lines.append(f"{name}_count{suffix} {value['count']}")
+                else:
+                    suffix = f"{{{key}}}" if key else ""
+                    lines.append(f"{name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+def reset_directory(directory):
+    """Vide le répertoire des métriques, au démarrage du master gunicorn"""
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+METRICS_DIR = os.environ.get(
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "video_extractor_metrics")
+)
+
+metrics = Metrics(METRICS_DIR)
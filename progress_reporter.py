@@ -0,0 +1,125 @@
+import json
+import sys
+import time
+from collections.abc import Callable
+from threading import Lock, Thread
+from typing import TextIO
+
+from rich.progress import Progress, Task, TaskID
+
+
+class ProgressReporter:
+    """
+    Collect yt-dlp progress from any number of hook threads and publish it
+    from a single thread at a fixed rate, either to Rich progress bars or as
+    JSON lines (headless mode).
+
+    A hook only stores its latest value: no lock, no rendering, so fragment
+    threads are not slowed down by the display.
+    """
+
+    def __init__(
+        self,
+        progress: Progress,
+        refresh_rate: float = 4.0,
+        headless: bool = False,
+        json_interval: float = 1.0,
+        stream: TextIO | None = None,
+    ):
+        self.progress = progress
+        self.interval = 1 / refresh_rate
+        self.headless = headless
+        self.json_interval = json_interval
+        self.stream = stream
+        # Called with (site, bytes) for each increase seen by the reporter
+        self.on_bytes: Callable[[str, int], None] | None = None
+
+        # Written by the hooks, read by the reporter thread
+        self.latest: dict[TaskID, tuple[int, int | None, str]] = {}
+        self.names: dict[TaskID, str] = {}
+        self.tasks: dict[TaskID, Task] = {}
+        self.published: dict[TaskID, tuple[int, int | None, str]] = {}
+        self.baseline: dict[TaskID, int] = {}
+        self.speeds: dict[TaskID, float] = {}
+        self.last_json = 0.0
+        self.last_tick = time.monotonic()
+
+        self.lock = Lock()
+        self.thread: Thread | None = None
+
+    def add(self, task_id: TaskID, name: str) -> None:
+        self.names[task_id] = name
+        self.tasks[task_id] = self.progress.tasks[task_id]
+
+    def report(self, task_id: TaskID, downloaded: int, total: int | None, site: str = "") -> None:
+        """Called from the yt-dlp hooks, as often as they like."""
+        self.latest[task_id] = (downloaded, total, site)
+
+    def restart(self, task_id: TaskID) -> None:
+        """A new attempt starts: its first report is not counted as downloaded bytes."""
+        self.latest.pop(task_id, None)
+        self.baseline.pop(task_id, None)
+
+    def finish(self, task_id: TaskID) -> None:
+        self.flush()
+        if self.headless:
+            self.emit({"event": "finished", "episode": self.names.get(task_id, "")})
+        self.latest.pop(task_id, None)
+        with self.lock:
+            self.published.pop(task_id, None)
+            self.baseline.pop(task_id, None)
+            self.speeds.pop(task_id, None)
+
+    def start(self) -> None:
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = Thread(target=self.run, daemon=True, name="progress-reporter")
+            self.thread.start()
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Publish every value that changed since the last publication."""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.last_tick, 1e-6)
+            self.last_tick = now
+
+            for task_id, value in dict(self.latest).items():
+                if self.published.get(task_id) == value:
+                    self.speeds[task_id] = 0.0
+                    continue
+                self.published[task_id] = value
+                downloaded, total, site = value
+
+                previous = self.baseline.get(task_id)
+                self.baseline[task_id] = downloaded
+                if previous is not None and downloaded >= previous:
+                    delta = downloaded - previous
+                    self.speeds[task_id] = delta / elapsed
+                    if delta and self.on_bytes is not None:
+                        self.on_bytes(site, delta)
+
+                if not self.headless:
+                    # Directly accessing .total is needed to not reset the speed
+                    self.tasks[task_id].total = total
+                    self.progress.update(task_id, completed=downloaded)
+
+            if self.headless and now - self.last_json >= self.json_interval:
+                self.last_json = now
+                for task_id, (downloaded, total, site) in self.published.items():
+                    self.emit({
+                        "event": "progress",
+                        "episode": self.names.get(task_id, ""),
+                        "site": site,
+                        "downloaded": downloaded,
+                        "total": total,
+                        "speed": round(self.speeds.get(task_id, 0.0)),
+                    })
+
+    def emit(self, record: dict) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        stream.flush()
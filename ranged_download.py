@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import random
+import re
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from pathlib import Path
+from threading import Lock
+
+import httpx
+
+from .http_client import PooledHTTPClient
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class RangesUnsupported(Exception):
+    """The server ignores Range requests or does not give the file size."""
+
+
+class RangedDownload:
+    """
+    Download one progressive file over several connections, each one
+    fetching its own byte ranges into a preallocated file.
+
+    Completed ranges are recorded next to the partial file, so an interrupted
+    download only fetches what is missing; a range that fails mid-way is
+    retried from the last byte written.
+    """
+
+    def __init__(
+        self,
+        client: PooledHTTPClient,
+        url: str,
+        path: Path,
+        headers: dict | None = None,
+        connections: int = 4,
+        range_size: int = 8 * 1024 * 1024,
+        retries: int = 5,
+        progress_hook: Callable[[dict], None] | None = None,
+    ):
+        self.client = client
+        self.url = url
+        self.path = path
+        self.headers = dict(headers or {})
+        self.connections = connections
+        self.range_size = range_size
+        self.retries = retries
+        self.progress_hook = progress_hook
+
+        self.part = path.with_name(path.name + ".ranged")
+        self.state = path.with_name(path.name + ".ranged.json")
+        self.lock = Lock()
+        # Without pwrite (Windows), seek and write must not interleave between ranges
+        self.write_lock = Lock()
+        self.downloaded = 0
+        self.size = 0
+        self.done: set[int] = set()
+
+    def get(self, start: int, end: int) -> AbstractContextManager[httpx.Response]:
+        return self.client.stream(
+            "GET",
+            self.url,
+            headers={**self.headers, "Range": f"bytes={start}-{end}"},
+            # Waiting for a pooled connection or a host slot is expected with many ranges
+            timeout=httpx.Timeout(30.0, pool=None),
+        )
+
+    def file_size(self) -> int:
+        with self.get(0, 0) as response:
+            match = CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", ""))
+            if response.status_code != 206 or not match:
+                raise RangesUnsupported(f"{self.url} answered {response.status_code} to a Range request")
+            return int(match.group(3))
+
+    def load_state(self) -> None:
+        """Ranges already written by a previous run, if it was for the same file."""
+        if not self.part.exists() or not self.state.exists():
+            return
+        try:
+            state = json.loads(self.state.read_text())
+        except ValueError:
+            return
+        if state.get("size") == self.size and state.get("range_size") == self.range_size:
+            self.done = set(state.get("done", []))
+
+    def save_state(self) -> None:
+        tmp = self.state.with_name(self.state.name + ".tmp")
+        tmp.write_text(json.dumps({"size": self.size, "range_size": self.range_size, "done": sorted(self.done)}))
+        os.replace(tmp, self.state)
+
+    def report(self, size: int, status: str = "downloading") -> None:
+        with self.lock:
+            self.downloaded += size
+            downloaded = self.downloaded
+        if self.progress_hook is not None:
+            self.progress_hook(
+                {
+                    "status": status,
+                    "downloaded_bytes": downloaded,
+                    "total_bytes": self.size,
+                    "filename": str(self.path),
+                    "tmpfilename": str(self.part),
+                }
+            )
+
+    def write_at(self, fd: int, chunk: bytes, offset: int) -> None:
+        if hasattr(os, "pwrite"):
+            os.pwrite(fd, chunk, offset)
+            return
+        with self.write_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while chunk:
+                chunk = chunk[os.write(fd, chunk) :]
+
+    def fetch(self, fd: int, index: int) -> None:
+        """Write range `index` at its offset, resuming after a failure."""
+        start = index * self.range_size
+        end = min(start + self.range_size, self.size) - 1
+        offset = start
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self.get(offset, end) as response:
+                    match = CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", ""))
+                    if response.status_code != 206 or not match or int(match.group(1)) != offset:
+                        raise httpx.HTTPStatusError(
+                            f"Unexpected answer {response.status_code} for bytes {offset}-{end}",
+                            request=response.request,
+                            response=response,
+                        )
+                    for chunk in response.iter_bytes(256 * 1024):
+                        chunk = chunk[: end + 1 - offset]
+                        self.write_at(fd, chunk, offset)
+                        offset += len(chunk)
+                        self.report(len(chunk))
+                        if offset > end:
+                            break
+
+                if offset > end:
+                    with self.lock:
+                        self.done.add(index)
+                        self.save_state()
+                    return
+            except httpx.HTTPError:
+                if attempt == self.retries:
+                    raise
+            # random is used to spread the retries of the ranges that failed together
+            time.sleep(min(2**attempt, 30) * random.uniform(0.8, 1.2))
+
+        raise httpx.ReadError(f"Incomplete range {start}-{end} of {self.url}")
+
+    def run(self) -> int:
+        """Download the file and return its size."""
+        self.size = self.file_size()
+        ranges = math.ceil(self.size / self.range_size)
+        self.load_state()
+        if not self.done:
+            self.part.unlink(missing_ok=True)
+
+        fd = os.open(self.part, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, self.size)
+            self.report(sum(min(self.range_size, self.size - i * self.range_size) for i in self.done))
+
+            missing = [index for index in range(ranges) if index not in self.done]
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                futures = [executor.submit(self.fetch, fd, index) for index in missing]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # Written ranges are kept for the next attempt
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            if len(self.done) != ranges or os.fstat(fd).st_size != self.size:
+                raise httpx.ReadError(f"Incomplete download of {self.url}")
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        os.replace(self.part, self.path)
+        self.state.unlink(missing_ok=True)
+        self.report(0, "finished")
+        return self.size
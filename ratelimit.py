@@ -0,0 +1,110 @@
+# ratelimit.py
+import os
+import time
+from threading import Lock
+
+from sites import registry
+
+# Limites par suffixe d'hôte des hôtes qui ne sont pas des sites du registre (CDN) :
+# (requêtes par seconde, rafale). Celles des sites sont dans leur profil (sites.py).
+DEFAULT_LIMITS = {
+    "googlevideo.com": (5.0, 10),
+}
+
+def parse_limits(spec):
+    """Parse "youtube.com=5:10,sibnet.ru=0.5:1" en {hôte: (débit, rafale)}"""
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        host, value = item.split("=", 1)
+        rate, _, burst = value.partition(":")
+        limits[host.strip().lower()] = (float(rate), int(burst or 1))
+    return limits
+
+class TokenBucket:
+    """Seau à jetons acceptant des réservations dans le futur"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """Prend un jeton et retourne le délai avant de pouvoir l'utiliser"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class DomainRateLimiter:
+    """Limiteur de débit par domaine, sans sommeil dans le thread appelant"""
+
+    def __init__(self, limits=None, default=(1.0, 1), sites=None):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.default = default
+        self.sites = sites
+        self.buckets = {}
+        self.waits = {}
+        self.lock = Lock()
+
+    def limit_for(self, domain):
+        """Limite du suffixe d'hôte le plus spécifique configuré, sinon celle du site
+        
+        Le site est résolu par le registre, miroirs reconnus par label compris.
+        """
+        labels = domain.lower().split(".")
+        for i in range(len(labels) - 1):
+            limit = self.limits.get(".".join(labels[i:]))
+            if limit:
+                return limit
+        if self.sites is not None:
+            limit = self.sites.lookup(domain).rate_limit
+            if limit:
+                return limit
+        return self.default
+
+    def reserve(self, domain):
+        """Réserve un créneau pour ce domaine et retourne le délai d'attente en secondes"""
+        with self.lock:
+            bucket = self.buckets.get(domain)
+            if bucket is None:
+                bucket = self.buckets[domain] = TokenBucket(*self.limit_for(domain))
+            delay = bucket.reserve(time.monotonic())
+
+            count, total, longest = self.waits.get(domain, (0, 0.0, 0.0))
+            self.waits[domain] = (count + 1, total + delay, max(longest, delay))
+        return delay
+
+    def refund(self, domain):
+        """Rend un créneau réservé mais finalement inutilisé"""
+        with self.lock:
+            bucket = self.buckets.get(domain)
+            if bucket is not None:
+                bucket.refund()
+
+    def stats(self):
+        with self.lock:
+            return {
+                domain: {
+                    "requests": count,
+                    "wait_total": round(total, 3),
+                    "wait_avg": round(total / count, 3) if count else 0.0,
+                    "wait_max": round(longest, 3),
+                    "rate": self.buckets[domain].rate,
+                    "burst": self.buckets[domain].burst
+                }
+                for domain, (count, total, longest) in self.waits.items()
+            }
+
+def create_rate_limiter():
+    """Limites des sites du registre, surchargées par RATE_LIMITS et RATE_LIMIT_DEFAULT"""
+    default = parse_limits("*=" + os.environ.get("RATE_LIMIT_DEFAULT", "1:1"))["*"]
+    return DomainRateLimiter(parse_limits(os.environ.get("RATE_LIMITS", "")), default, registry)
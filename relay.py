@@ -0,0 +1,511 @@
+# relay.py
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import mimetypes
+import os
+import re
+import secrets
+import socket
+import stat
+import tempfile
+import time
+from threading import Event, Lock
+from urllib.parse import urljoin
+
+import httpx
+
+from http_client import PooledHTTPClient
+from sites import registry as sites
+
+logger = logging.getLogger(__name__)
+
+# Taille des morceaux envoyés au client
+CHUNK_SIZE = 64 * 1024
+
+# Headers de l'origine transmis tels quels au client
+PASSTHROUGH_HEADERS = ("Content-Type", "Content-Length", "Content-Range", "Accept-Ranges", "Last-Modified", "ETag")
+
+SEGMENT_TYPES = {
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".aac": "audio/aac",
+    ".key": "application/octet-stream",
+}
+
+# Attribut URI="..." des tags HLS (EXT-X-KEY, EXT-X-MAP, EXT-X-MEDIA...)
+URI_ATTRIBUTE = re.compile(r'URI="([^"]*)"')
+
+class RelayError(Exception):
+    """Ressource de l'origine indisponible, avec le statut à renvoyer au client"""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+def parse_range(header, size):
+    """(début, fin) d'un en-tête Range sur une seule plage, None pour le fichier entier"""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise RelayError("Range not satisfiable", 416)
+    return start, end
+
+def is_public_address(address):
+    """Adresse routable sur Internet : ni privée, ni loopback, ni link-local (169.254.169.254...)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+class PublicTargets:
+    """Hook httpx : refuse les requêtes (redirections comprises) vers une adresse interne
+
+    Le jeton prouve seulement que l'URL vient d'une extraction ; la page
+    extraite choisit l'URL, donc l'hôte est résolu et vérifié avant chaque
+    requête. Les résolutions sont gardées ttl secondes pour ne pas refaire
+    un appel DNS par segment.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = Lock()
+        self.resolved = {}
+        self.blocked = 0
+
+    def check(self, host):
+        now = time.monotonic()
+        with self.lock:
+            cached = self.resolved.get(host)
+        if cached is None or cached[0] <= now:
+            try:
+                addresses = {info[4][0] for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)}
+            except (socket.gaierror, UnicodeError) as e:
+                raise RelayError(f"Relay target unresolvable: {host} ({e})")
+            cached = (now + self.ttl, all(is_public_address(a) for a in addresses))
+            with self.lock:
+                self.resolved[host] = cached
+        if not cached[1]:
+            with self.lock:
+                self.blocked += 1
+            raise RelayError(f"Relay target not allowed: {host} resolves to a private address", 403)
+
+    def __call__(self, request):
+        self.check(request.url.host)
+
+def read_file(path, start, length):
+    """Morceaux d'un fichier, sans le charger en mémoire"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+class RelayTokens:
+    """URLs d'origine signées : le relais ne sert que des flux issus d'une extraction"""
+
+    def __init__(self, secret):
+        self.secret = secret
+
+    def sign(self, payload):
+        return base64.urlsafe_b64encode(
+            hmac.new(self.secret, payload, hashlib.sha256).digest()[:16]
+        ).rstrip(b"=")
+
+    def encode(self, url, kind, host):
+        payload = base64.urlsafe_b64encode(
+            json.dumps({"u": url, "k": kind, "h": host}, separators=(",", ":")).encode()
+        ).rstrip(b"=")
+        return (payload + b"." + self.sign(payload)).decode()
+
+    def decode(self, token):
+        """(url, type, hôte de la page) d'un jeton valide, None sinon"""
+        try:
+            payload, signature = token.encode().split(b".", 1)
+            if not hmac.compare_digest(signature, self.sign(payload)):
+                return None
+            data = json.loads(base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4)))
+            return data["u"], data["k"], data["h"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+class SegmentCache:
+    """Segments sur disque, partagés entre spectateurs et entre workers
+
+    Un seul téléchargement par segment : les requêtes simultanées attendent
+    sa fin puis lisent le fichier. Les segments les moins récemment servis
+    sont supprimés au-delà de max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, max_segment=16 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_segment = max_segment
+        self.lock = Lock()
+        self.fetching = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Segment cache directory unavailable, relay without cache: {e}")
+                self.directory = None
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def get(self, url, fetch):
+        """Chemin du segment en cache, téléchargé par fetch(fichier) au premier appel
+
+        None si le segment ne peut pas être mis en cache (trop gros, pas de cache).
+        """
+        if not self.directory:
+            return None
+        path = self.path(url)
+        while True:
+            if os.path.exists(path):
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                with self.lock:
+                    self.hits += 1
+                return path
+
+            with self.lock:
+                event = self.fetching.get(path)
+                leader = event is None
+                if leader:
+                    event = self.fetching[path] = Event()
+            if not leader:
+                # Un autre spectateur télécharge ce segment
+                event.wait()
+                if not os.path.exists(path):
+                    return None
+                continue
+
+            try:
+                with self.lock:
+                    self.misses += 1
+                size = self.download(path, fetch)
+                if size is None:
+                    return None
+                self.added(size)
+                return path
+            finally:
+                with self.lock:
+                    del self.fetching[path]
+                event.set()
+
+    def download(self, path, fetch):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                size = fetch(f, self.max_segment)
+            if size is None:
+                os.remove(tmp)
+                return None
+            os.replace(tmp, path)
+            return size
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def added(self, size):
+        with self.lock:
+            if self.total is not None:
+                self.total += size
+            if self.total is not None and self.total <= self.max_bytes:
+                return
+        self.evict()
+
+    def evict(self):
+        """Supprime les segments les plus anciens ; le répertoire fait foi entre workers"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            entries.sort()
+            # Descendre sous 90 % pour ne pas évincer à chaque segment
+            for _, size, name in entries:
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                with self.lock:
+                    self.evictions += 1
+        with self.lock:
+            self.total = total
+
+    def stats(self):
+        with self.lock:
+            return {
+                "enabled": bool(self.directory),
+                "bytes": self.total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "downloading": len(self.fetching)
+            }
+
+class StreamRelay:
+    """Relais des flux extraits : playlists réécrites, segments en cache, MP4 par plages"""
+
+    def __init__(self, client, tokens, segments, prefix="/api/relay", targets=None):
+        self.client = client
+        self.tokens = tokens
+        self.segments = segments
+        self.targets = targets
+        self.prefix = prefix
+        self.lock = Lock()
+        self.bytes_sent = 0
+        self.errors = 0
+
+    def url_for(self, url, kind, host):
+        """Chemin du relais pour une URL d'origine ("playlist", "segment" ou "file")"""
+        return f"{self.prefix}?t={self.tokens.encode(url, kind, host)}"
+
+    def headers(self, host):
+        """Headers attendus par le site d'origine (Referer...)"""
+        site = sites.lookup(host)
+        return {k: v.format(host=host) for k, v in site.headers.items()}
+
+    def serve(self, token, range_header=None):
+        """(statut, headers, morceaux du corps) pour un jeton du relais"""
+        decoded = self.tokens.decode(token)
+        if decoded is None:
+            raise RelayError("Invalid relay token", 403)
+        url, kind, host = decoded
+        if kind == "playlist":
+            return self.playlist(url, host)
+        if kind == "segment":
+            return self.segment(url, host, range_header)
+        return self.passthrough(url, host, range_header)
+
+    def playlist(self, url, host):
+        """Playlist HLS dont chaque URI pointe vers le relais"""
+        try:
+            response = self.client.get(url, headers=self.headers(host))
+        except httpx.HTTPError as e:
+            self.failed()
+            raise RelayError(f"Playlist unavailable: {e}")
+        if response.status_code != 200:
+            self.failed()
+            raise RelayError(f"Playlist unavailable: HTTP {response.status_code}")
+
+        base = str(response.url)
+        lines = []
+        next_is_playlist = False
+        for line in response.text.splitlines():
+            stripped = line.strip()
+            if stripped.startswith("#"):
+                # Variantes et rendus alternatifs : des playlists ; clés et init : des segments
+                tag_kind = "playlist" if stripped.startswith(("#EXT-X-MEDIA:", "#EXT-X-I-FRAME-STREAM-INF:")) else "segment"
+                line = URI_ATTRIBUTE.sub(
+                    lambda m: 'URI="{}"'.format(self.url_for(urljoin(base, m.group(1)), tag_kind, host)),
+                    line
+                )
+                next_is_playlist = stripped.startswith("#EXT-X-STREAM-INF")
+            elif stripped:
+                target = urljoin(base, stripped)
+                is_playlist = next_is_playlist or target.split("?")[0].endswith(".m3u8")
+                line = self.url_for(target, "playlist" if is_playlist else "segment", host)
+                next_is_playlist = False
+            lines.append(line)
+
+        body = ("\n".join(lines) + "\n").encode()
+        self.sent(len(body))
+        return 200, {
+            "Content-Type": "application/vnd.apple.mpegurl",
+            "Content-Length": str(len(body)),
+            "Cache-Control": "no-cache"
+        }, [body]
+
+    def segment(self, url, host, range_header):
+        """Segment servi depuis le cache disque, téléchargé une fois pour tous les spectateurs"""
+        def fetch(f, limit):
+            with self.client.stream("GET", url, headers=self.headers(host)) as response:
+                if response.status_code != 200:
+                    raise RelayError(f"Segment unavailable: HTTP {response.status_code}",
+                                     404 if response.status_code == 404 else 502)
+                if int(response.headers.get("Content-Length") or 0) > limit:
+                    return None
+                size = 0
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > limit:
+                        return None
+                    f.write(chunk)
+                return size
+
+        try:
+            path = self.segments.get(url, fetch)
+        except httpx.HTTPError as e:
+            self.failed()
+            raise RelayError(f"Segment unavailable: {e}")
+        except RelayError:
+            self.failed()
+            raise
+        if path is None:
+            # Segment trop gros ou cache désactivé : relais direct
+            return self.passthrough(url, host, range_header)
+
+        size = os.path.getsize(path)
+        content_type = SEGMENT_TYPES.get(os.path.splitext(url.split("?")[0])[1]) \
+            or mimetypes.guess_type(url.split("?")[0])[0] or "application/octet-stream"
+        headers = {"Content-Type": content_type, "Accept-Ranges": "bytes"}
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            start, length, status = 0, size, 200
+        else:
+            start, end = byte_range
+            length, status = end - start + 1, 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(length)
+        return status, headers, self.counted(read_file(path, start, length))
+
+    def passthrough(self, url, host, range_header):
+        """Fichier de l'origine transmis par morceaux, requête Range comprise"""
+        headers = self.headers(host)
+        if range_header:
+            headers["Range"] = range_header
+        stream = self.client.stream("GET", url, headers=headers)
+        try:
+            response = stream.__enter__()
+        except httpx.HTTPError as e:
+            self.failed()
+            raise RelayError(f"Stream unavailable: {e}")
+        if response.status_code not in (200, 206, 416):
+            stream.__exit__(None, None, None)
+            self.failed()
+            raise RelayError(f"Stream unavailable: HTTP {response.status_code}",
+                             404 if response.status_code == 404 else 502)
+
+        def body():
+            # La connexion est rendue au pool à la fin de la lecture, ou si le client part
+            try:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    self.sent(len(chunk))
+                    yield chunk
+            finally:
+                stream.__exit__(None, None, None)
+
+        passed = {k: response.headers[k] for k in PASSTHROUGH_HEADERS if k in response.headers}
+        return response.status_code, passed, body()
+
+    def counted(self, chunks):
+        for chunk in chunks:
+            self.sent(len(chunk))
+            yield chunk
+
+    def sent(self, size):
+        with self.lock:
+            self.bytes_sent += size
+
+    def failed(self):
+        with self.lock:
+            self.errors += 1
+
+    def stats(self):
+        with self.lock:
+            stats = {"bytes_sent": self.bytes_sent, "upstream_errors": self.errors}
+        stats["private_targets"] = "allowed" if self.targets is None else {"blocked": self.targets.blocked}
+        stats["segments"] = self.segments.stats()
+        stats["http"] = self.client.stats()
+        return stats
+
+def private_directory(path):
+    """Répertoire 0700 de l'utilisateur courant ; refuse un répertoire créé par un autre"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"Relay secret directory is not private: {path}")
+    return path
+
+def relay_secret():
+    """Secret de signature : RELAY_SECRET, sinon un fichier 0600 partagé par les workers
+
+    Le fichier vit dans un répertoire privé de l'utilisateur (RELAY_SECRET_DIR) :
+    un autre compte de la machine ne peut ni le lire ni le remplacer par le sien.
+    """
+    secret = os.environ.get("RELAY_SECRET")
+    if secret:
+        return secret.encode()
+    directory = private_directory(os.environ.get(
+        "RELAY_SECRET_DIR",
+        os.path.join(tempfile.gettempdir(), f"video_extractor-{os.getuid()}")
+    ))
+    path = os.path.join(directory, "relay_secret")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    # Le premier worker peut être en train d'écrire le fichier
+    for _ in range(50):
+        with os.fdopen(os.open(path, os.O_RDONLY | os.O_NOFOLLOW)) as f:
+            secret = f.read().strip()
+        if secret:
+            return secret.encode()
+        time.sleep(0.01)
+    raise RuntimeError(f"Empty relay secret file: {path}")
+
+def create_relay():
+    """Relais configuré par RELAY_CACHE_DIR (vide : sans cache), RELAY_CACHE_MAX_BYTES et RELAY_MAX_CONNECTIONS
+
+    Les origines privées ou locales sont refusées sauf avec RELAY_ALLOW_PRIVATE=1
+    (bancs de test sur un faux site local).
+    """
+    directory = os.environ.get(
+        "RELAY_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "video_extractor_segments")
+    )
+    segments = SegmentCache(
+        directory or None,
+        max_bytes=int(os.environ.get("RELAY_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        max_segment=int(os.environ.get("RELAY_SEGMENT_MAX_BYTES", 16 * 1024 * 1024))
+    )
+    targets = None if os.environ.get("RELAY_ALLOW_PRIVATE") == "1" else PublicTargets()
+    # Client séparé : les flux longs ne doivent pas priver les extractions de connexions
+    client = PooledHTTPClient(
+        max_connections=int(os.environ.get("RELAY_MAX_CONNECTIONS", 100)),
+        max_per_host=int(os.environ.get("RELAY_MAX_PER_HOST", 32)),
+        timeout=30,
+        event_hooks={"request": [targets]} if targets is not None else None
+    )
+    return StreamRelay(client, RelayTokens(relay_secret()), segments, targets=targets)
@@ -1,48 +1,466 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 import yt_dlp
 import time
 import random
 import logging
 import os
+import json
+from collections import deque, defaultdict, Counter
 from urllib.parse import urlparse
-import requests
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError, wait, FIRST_COMPLETED
+import gc
 import hashlib
-from threading import Thread
+import heapq
+import math
+from itertools import count
+from threading import Thread, Lock, Event, BoundedSemaphore, Condition, local
 from datetime import datetime, timedelta
 
+from cache import create_cache, ttl_for_stream
+from ratelimit import create_rate_limiter
+from failures import create_failure_cache, classify, ExtractionFailed
+from ydl_pool import ydl_pool
+from http_client import http_client
+from sites import registry as sites, DEFAULT_CHAIN
+from metrics import metrics
+from relay import create_relay, RelayError
+from jobs import create_job_store
+from extract_workers import create_extraction_workers, run_extraction
+
 app = Flask(__name__)
 
 # Configuration des logs - plus léger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Cache avec expiration
-class SimpleCache:
-    def __init__(self, ttl_seconds=1800):
-        self.cache = {}
-        self.ttl = ttl_seconds
-    
-    def get(self, key):
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.ttl:
-                return data
+# Métriques Prometheus, agrégées entre workers
+STAGE_LATENCY = metrics.histogram(
+    "extractor_stage_seconds",
+    "Duration of each extraction stage, by stage and site"
+)
+REQUEST_LATENCY = metrics.histogram(
+    "extractor_request_seconds",
+    "Duration of extraction API requests, by endpoint"
+)
+REQUESTS = metrics.counter(
+    "extractor_requests_total",
+    "Extraction API responses, by endpoint and status code"
+)
+CACHE_LOOKUPS = metrics.counter(
+    "extractor_cache_lookups_total",
+    "Result cache lookups, by result"
+)
+NEGATIVE_CACHE_HITS = metrics.counter(
+    "extractor_negative_cache_hits_total",
+    "Requests refused by the negative cache without extraction, by scope and reason"
+)
+# Étape mesurée pour chaque stratégie de fallback
+STRATEGY_STAGES = {"direct": "ytdlp", "proxy": "proxy", "cobalt": "cobalt"}
+# Stratégies qui interrogent le site lui-même : chacune consomme un créneau de rate limiting
+RATE_LIMITED_STRATEGIES = {"direct", "proxy"}
+
+# Cache global
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 1800))
+# Fraction de la durée de vie au-delà de laquelle une entrée est rafraîchie en arrière-plan
+CACHE_REFRESH_FRACTION = float(os.environ.get("CACHE_REFRESH_FRACTION", 0.75))
+url_cache = create_cache(CACHE_TTL)
+
+class SingleFlight:
+    """Déduplique les appels concurrents portant sur une même clé"""
+    
+    class _Call:
+        def __init__(self):
+            self.done = Event()
+            self.result = None
+            self.error = None
+            self.waiters = 0
+            # Pour les appelants qui rejoignent l'appel sans bloquer de thread
+            self.future = Future()
+    
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+        self.pending = {}
+        # Appelants encore en attente de chaque appel planifié
+        self.followers = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    def do(self, key, fn, *args):
+        """Exécute fn une seule fois par clé, les autres appelants partagent le résultat"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self._Call()
+                self.calls[key] = call
+                self.leaders += 1
+                leader = True
             else:
-                del self.cache[key]
-        return None
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Copie pour que chaque appelant puisse annoter son résultat
+            return dict(call.result) if isinstance(call.result, dict) else call.result
+        
+        return self._lead(key, call, fn, *args)
     
-    def set(self, key, value):
-        self.cache[key] = (value, time.time())
+    def _lead(self, key, call, fn, *args):
+        rescheduled = False
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Reschedule as r:
+            # L'appel reprendra dans le pool : il reste ouvert pour ceux qui l'attendent
+            r.wrap(self._lead, key, call)
+            rescheduled = True
+            raise
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            if not rescheduled:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+                if call.error is not None:
+                    call.future.set_exception(call.error)
+                else:
+                    call.future.set_result(call.result)
     
-    def clear(self):
-        self.cache.clear()
+    def submit(self, key, start):
+        """Future du résultat pour cette clé, sans bloquer de thread
+        
+        start() planifie l'appel et retourne sa Future ; il n'est lancé que si
+        aucun appel n'est planifié ou en cours pour la clé. Chaque appelant,
+        premier compris, reçoit sa propre Future et l'attend avec sa propre
+        échéance : l'annuler n'affecte pas les autres. L'appel planifié n'est
+        annulé qu'une fois tous ses appelants partis.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                source = call.future
+                self.coalesced += 1
+            else:
+                source = self.pending.get(key)
+                if source is None:
+                    # Planifié mais pas encore démarré (file du pool, rate limiting)
+                    source = self.pending[key] = start()
+                    self.followers[source] = 0
+                    source.add_done_callback(lambda f: self._scheduled(key, f))
+                else:
+                    self.coalesced += 1
+                if source in self.followers:
+                    self.followers[source] += 1
+        
+        future = Future()
+        
+        def relay(done):
+            if not future.set_running_or_notify_cancel():
+                return
+            if done.cancelled():
+                future.set_exception(TimeoutError("Shared extraction cancelled"))
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                result = done.result()
+                future.set_result(dict(result) if isinstance(result, dict) else result)
+        
+        def left(derived):
+            if derived.cancelled():
+                self._left(source)
+        
+        future.add_done_callback(left)
+        source.add_done_callback(relay)
+        return future
+    
+    def _left(self, source):
+        """Un appelant a abandonné : l'appel planifié est annulé s'il était le dernier"""
+        with self.lock:
+            remaining = self.followers.get(source)
+            if remaining is None:
+                return
+            remaining = self.followers[source] = remaining - 1
+        if remaining <= 0:
+            source.cancel()
+    
+    def _scheduled(self, key, future):
+        with self.lock:
+            self.followers.pop(future, None)
+            if self.pending.get(key) is future:
+                del self.pending[key]
     
-    def size(self):
-        return len(self.cache)
+    def stats(self):
+        with self.lock:
+            return {
+                "in_flight": len(self.calls),
+                "scheduled": len(self.pending),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced
+            }
 
-# Cache global
-url_cache = SimpleCache()
+class PoolSaturated(Exception):
+    """Levée quand le pool d'extraction et sa file d'attente sont pleins"""
+    
+    retry_after = 5
+
+class RateLimited(PoolSaturated):
+    """Levée quand l'attente imposée par le rate limiting dépasse l'échéance de la requête"""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class Reschedule(Exception):
+    """Levée par une tâche du pool pour rendre son thread et reprendre après delay secondes
+    
+    La tâche garde sa place et sa Future ; chaque niveau traversé enveloppe
+    la reprise (wrap) pour y retrouver son propre contexte.
+    """
+    
+    def __init__(self, delay, fn, *args):
+        super().__init__(f"Rescheduled in {delay:.1f}s")
+        self.delay = delay
+        self.fn = fn
+        self.args = args
+    
+    def wrap(self, fn, *args):
+        """La reprise appellera fn(*args, reprise précédente, ses arguments...)"""
+        self.args = args + (self.fn,) + self.args
+        self.fn = fn
+
+class ExtractionPool:
+    """Pool d'extraction partagé par worker, avec file d'attente bornée"""
+    
+    def __init__(self, workers=4, max_queue=8):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+        # Une place par thread plus une par requête en attente
+        self.slots = BoundedSemaphore(workers + max_queue)
+        self.lock = Lock()
+        self.queued = 0
+        self.running = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rescheduled = 0
+        self.context = local()
+        
+        # Tâches différées (rate limiting), démarrées par un thread unique
+        self.delayed = []
+        self.sequence = count()
+        self.timer = None
+        self.timer_cond = Condition()
+    
+    def submit(self, fn, *args, delay=0, **kwargs):
+        """Soumet une tâche, ou lève PoolSaturated immédiatement si tout est plein
+        
+        Avec delay, la tâche attend dans la file sans occuper de thread du pool.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PoolSaturated("Extraction pool saturated")
+        
+        with self.lock:
+            self.queued += 1
+        
+        future = Future()
+        future.add_done_callback(self._release)
+        task = (future, fn, args, kwargs)
+        
+        if delay > 0:
+            self._schedule(time.monotonic() + delay, task)
+        else:
+            self.executor.submit(self._execute, *task)
+        return future
+    
+    def _release(self, future):
+        # Une tâche annulée avant d'avoir démarré n'est jamais sortie de la file
+        if future.cancelled():
+            with self.lock:
+                self.queued -= 1
+        self.slots.release()
+    
+    def _execute(self, future, fn, args, kwargs):
+        # Une tâche qui reprend après Reschedule est déjà marquée comme démarrée
+        if not future.running() and not future.set_running_or_notify_cancel():
+            return
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+        self.context.resumable = True
+        try:
+            result = fn(*args, **kwargs)
+        except Reschedule as r:
+            # Le thread est rendu ; la tâche attend sa reprise dans la file différée
+            with self.lock:
+                self.running -= 1
+                self.queued += 1
+                self.rescheduled += 1
+            self._schedule(time.monotonic() + r.delay, (future, r.fn, r.args, {}))
+        except BaseException as e:
+            with self.lock:
+                self.running -= 1
+            future.set_exception(e)
+        else:
+            with self.lock:
+                self.running -= 1
+            future.set_result(result)
+        finally:
+            self.context.resumable = False
+    
+    def resumable(self):
+        """Vrai dans une tâche du pool, qui peut lever Reschedule au lieu d'attendre"""
+        return getattr(self.context, "resumable", False)
+    
+    def _schedule(self, when, task):
+        with self.timer_cond:
+            heapq.heappush(self.delayed, (when, next(self.sequence), task))
+            if self.timer is None or not self.timer.is_alive():
+                self.timer = Thread(target=self._dispatch_delayed, daemon=True)
+                self.timer.start()
+            self.timer_cond.notify()
+    
+    def _dispatch_delayed(self):
+        """Transmet chaque tâche différée à l'executor à son échéance"""
+        while True:
+            with self.timer_cond:
+                while not self.delayed:
+                    self.timer_cond.wait()
+                when, _, task = self.delayed[0]
+                remaining = when - time.monotonic()
+                if remaining > 0:
+                    self.timer_cond.wait(remaining)
+                    continue
+                heapq.heappop(self.delayed)
+            
+            if not task[0].cancelled():
+                self.executor.submit(self._execute, *task)
+    
+    def wait(self, future, timeout=60):
+        """Attend une tâche et rend la main au plus tard après timeout secondes"""
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            # Annulée si elle attend encore, sinon abandonnée à son échéance
+            cancelled = future.cancel()
+            with self.lock:
+                self.timeouts += 1
+                if cancelled:
+                    self.cancelled += 1
+            raise
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "delayed": len(self.delayed),
+                "running": self.running,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+                "rescheduled": self.rescheduled
+            }
+
+EXTRACT_TIMEOUT = int(os.environ.get("EXTRACT_TIMEOUT", 60))
+extraction_pool = ExtractionPool(
+    workers=int(os.environ.get("EXTRACT_WORKERS", 4)),
+    max_queue=int(os.environ.get("EXTRACT_QUEUE", 8))
+)
+metrics.gauge(
+    "extractor_queue_depth",
+    "Extractions waiting in the pool queue, including rate-limited ones",
+    lambda: extraction_pool.queued
+)
+# Extractions yt-dlp dans des processus séparés (EXTRACT_PROCESSES > 0)
+extraction_workers = create_extraction_workers(EXTRACT_TIMEOUT)
+
+metrics.gauge(
+    "extractor_in_flight",
+    "Extractions currently running in the pool",
+    lambda: extraction_pool.running
+)
+
+# Jobs d'extraction asynchrones (/api/jobs)
+jobs = create_job_store()
+JOBS_MAX_WAIT = float(os.environ.get("JOBS_MAX_WAIT", 25))
+SSE_KEEPALIVE = float(os.environ.get("SSE_KEEPALIVE", 15))
+
+# API cobalt utilisée en dernier recours
+COBALT_API_URL = os.environ.get("COBALT_API_URL", "https://co.wuk.sh/api/json")
+PROXY_SOURCE_URL = os.environ.get(
+    "PROXY_SOURCE_URL",
+    "https://api.proxyscrape.com/v2/?request=get&protocol=http&timeout=5000&country=all&ssl=all&anonymity=all&format=textplain&limit=10"
+)
+
+# Relais optionnel des flux extraits (playlists réécrites, segments en cache)
+RELAY_ENABLED = os.environ.get("RELAY_ENABLED") == "1"
+relay = create_relay() if RELAY_ENABLED else None
+
+# Hedging : lancer la stratégie suivante si la précédente tarde à répondre
+HEDGED_EXTRACTION = os.environ.get("HEDGED_EXTRACTION") == "1"
+HEDGE_DELAY = float(os.environ.get("HEDGE_DELAY", 5))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 0.5))
+HEDGE_MAX_DELAY = float(os.environ.get("HEDGE_MAX_DELAY", 20))
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 90))
+# Une place par stratégie de chaque extraction du pool : les tentatives perdantes
+# déjà démarrées ne s'annulent pas, la principale d'une requête ne doit pas les attendre
+hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("HEDGE_WORKERS", extraction_pool.workers * len(DEFAULT_CHAIN))),
+    thread_name_prefix="hedge"
+)
+
+class LatencyTracker:
+    """Latences récentes des extractions réussies, par domaine et par stratégie"""
+    
+    def __init__(self, window=100, min_samples=5):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples = {}
+        self.lock = Lock()
+    
+    def record(self, domain, strategy, seconds):
+        with self.lock:
+            samples = self.samples.get((domain, strategy))
+            if samples is None:
+                samples = self.samples[(domain, strategy)] = deque(maxlen=self.window)
+            samples.append(seconds)
+    
+    def percentile(self, domain, strategy, p):
+        with self.lock:
+            samples = sorted(self.samples.get((domain, strategy), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(p / 100 * len(samples)) - 1)]
+    
+    def hedge_delay(self, domain, strategy):
+        """Délai avant de lancer la stratégie suivante : le percentile observé, borné"""
+        observed = self.percentile(domain, strategy, HEDGE_PERCENTILE)
+        if observed is None:
+            return HEDGE_DELAY
+        return min(max(observed, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+    
+    def stats(self):
+        with self.lock:
+            keys = list(self.samples)
+        return {
+            f"{domain}/{strategy}": {
+                "p50": self.percentile(domain, strategy, 50),
+                "p90": self.percentile(domain, strategy, 90),
+                "hedge_delay": self.hedge_delay(domain, strategy)
+            }
+            for domain, strategy in keys
+        }
 
 class LightweightExtractor:
     """Extracteur optimisé pour démarrage rapide"""
@@ -59,11 +477,25 @@ class LightweightExtractor:
         self.free_proxies = []
         self.proxy_index = 0
         
-        # Rate limiting simple
-        self.last_request = {}
+        # Rate limiting par domaine, créneaux réservés avant d'entrer dans le pool
+        self.rate_limiter = create_rate_limiter()
+        self.prepaid_slot = local()
+        
+        # Extractions en cours, partagées entre requêtes concurrentes
+        self.inflight = SingleFlight()
+        
+        # Échecs récents par URL et par domaine (cache négatif)
+        self.failures = create_failure_cache()
+        
+        # Latences par stratégie, pour calibrer le hedging
+        self.latency = LatencyTracker()
+        self.hedges = 0
+        self.wins = Counter()
+        self.stats_lock = Lock()
         
-        # Charger les proxies en arrière-plan après le démarrage
-        self.load_proxies_async()
+        # Rafraîchissements en arrière-plan (stale-while-revalidate)
+        self.refreshing = set()
+        self.refresh_lock = Lock()
     
     def load_proxies_async(self):
         """Charge les proxies en arrière-plan sans bloquer le démarrage"""
@@ -83,10 +515,12 @@ class LightweightExtractor:
         """Récupère des proxies gratuits - version simplifiée"""
         proxies = []
         
-        # Une seule source de proxy pour accélérer
+        # Une seule source de proxy pour accélérer (vide : pas de proxies)
+        if not PROXY_SOURCE_URL:
+            return proxies
         try:
-            response = requests.get(
-                "https://api.proxyscrape.com/v2/?request=get&protocol=http&timeout=5000&country=all&ssl=all&anonymity=all&format=textplain&limit=10",
+            response = http_client.get(
+                PROXY_SOURCE_URL,
                 timeout=5
             )
             if response.status_code == 200:
@@ -106,13 +540,91 @@ class LightweightExtractor:
         return random.choice(self.free_proxies)
     
     def rate_limit_check(self, domain):
-        """Vérification simple du rate limiting"""
-        now = time.time()
-        if domain in self.last_request:
-            elapsed = now - self.last_request[domain]
-            if elapsed < 1:  # Minimum 1 seconde entre requêtes
-                time.sleep(1 - elapsed)
-        self.last_request[domain] = time.time()
+        """Consomme le créneau réservé à l'avance, sinon attend le prochain
+        
+        Les chaînes du pool réservent chaque créneau avant la stratégie : seul
+        un appelant synchrone, hors du pool, attend ici dans son propre thread.
+        """
+        if getattr(self.prepaid_slot, "domain", None) == domain:
+            self.prepaid_slot.domain = None
+            return
+        delay = self.reserve_slot(domain)
+        if delay > 0:
+            time.sleep(delay)
+    
+    def reserve_slot(self, domain):
+        """Réserve un créneau de rate limiting et mesure l'attente qu'il impose"""
+        delay = self.rate_limiter.reserve(domain)
+        STAGE_LATENCY.observe(delay, stage="rate_limit", site=sites.lookup(domain).name)
+        return delay
+    
+    def reserve_before(self, domain, deadline):
+        """Réserve un créneau, rendu aussitôt (RateLimited) s'il arrive après l'échéance
+        
+        Un créneau après l'échéance ne servirait qu'à endetter le domaine.
+        """
+        delay = self.reserve_slot(domain)
+        if deadline is not None and time.time() + delay >= deadline:
+            self.rate_limiter.refund(domain)
+            raise RateLimited(delay)
+        return delay
+    
+    def prepaid(self, domain, fn, *args):
+        """Exécute fn avec un créneau de rate limiting déjà réservé pour domain"""
+        self.prepaid_slot.domain = domain
+        try:
+            return fn(*args)
+        except Reschedule as r:
+            # La reprise consommera le créneau réservé pour la stratégie suivante
+            r.wrap(self.prepaid, domain)
+            raise
+        finally:
+            # Créneau non consommé (résultat en cache entre-temps) : le rendre
+            if self.prepaid_slot.domain == domain:
+                self.prepaid_slot.domain = None
+                self.rate_limiter.refund(domain)
+    
+    def refund_cancelled(self, domain, future):
+        """Callback : une tâche annulée avant de démarrer n'a pas consommé son créneau"""
+        if future.cancelled():
+            self.rate_limiter.refund(domain)
+    
+    def submit(self, url, deadline=None, force=False):
+        """Planifie l'extraction dans le pool, après l'attente imposée par le rate limiting
+        
+        L'attente se fait dans la file du pool, sans bloquer de thread.
+        Avec force, un échec récent en cache négatif est ignoré.
+        """
+        cached = self.lookup(url)
+        if cached:
+            future = Future()
+            future.set_result(cached)
+            return future
+        
+        try:
+            self.check_failures(url, force)
+        except ExtractionFailed as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        
+        # Rejoindre une extraction planifiée ou en cours ne consomme ni place du pool ni thread
+        cache_key = hashlib.md5(url.encode()).hexdigest()
+        return self.inflight.submit(cache_key, lambda: self.schedule(url, deadline))
+    
+    def schedule(self, url, deadline=None):
+        """Réserve un créneau de rate limiting et place l'extraction dans le pool"""
+        domain = urlparse(url).hostname or ""
+        delay = self.reserve_before(domain, deadline)
+        try:
+            future = extraction_pool.submit(self.prepaid, domain, self.extract_missed, url, deadline, delay=delay)
+        except PoolSaturated:
+            self.rate_limiter.refund(domain)
+            raise
+        
+        # Annulée avant de démarrer (timeout du client) : le créneau n'a pas servi
+        future.add_done_callback(lambda f: self.refund_cancelled(domain, f))
+        return future
     
     def get_basic_headers(self, url):
         """Headers basiques mais efficaces"""
@@ -125,7 +637,7 @@ class LightweightExtractor:
             "Upgrade-Insecure-Requests": "1"
         }
     
-    def extract_simple(self, url, use_proxy=False):
+    def extract_simple(self, url, use_proxy=False, deadline=None):
         """Extraction simplifiée et rapide"""
         domain = urlparse(url).hostname or ""
         self.rate_limit_check(domain)
@@ -153,87 +665,310 @@ class LightweightExtractor:
                 logger.info(f"Using proxy: {proxy}")
         
         # Options spécifiques par site
-        if "youtube.com" in domain or "youtu.be" in domain:
-            ydl_opts["format"] = "best[height<=720]/best"
-        elif "vidmoly" in domain:
-            ydl_opts["http_headers"]["Referer"] = f"https://{domain}/"
-        elif "sibnet.ru" in domain:
-            ydl_opts["http_headers"]["Referer"] = "https://video.sibnet.ru/"
+        ydl_opts = sites.lookup(domain).options(ydl_opts, domain)
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if info:
-                    # Récupérer l'URL directe
-                    video_url = info.get("url")
-                    if not video_url and info.get("formats"):
-                        # Chercher le meilleur format
-                        for fmt in reversed(info["formats"]):
-                            if fmt.get("url"):
-                                video_url = fmt["url"]
-                                break
-                    
-                    if video_url:
-                        return {
-                            "success": True,
-                            "url": video_url,
-                            "is_hls": ".m3u8" in video_url,
-                            "title": info.get("title", "Video"),
-                            "duration": info.get("duration"),
-                            "thumbnail": info.get("thumbnail"),
-                            "site": domain
-                        }
+            # Dans un processus d'extraction, seul le résultat compact revient
+            if extraction_workers is not None:
+                return extraction_workers.run(url, ydl_opts, domain, deadline)
+            return run_extraction(url, ydl_opts, domain)
         except Exception as e:
             logger.error(f"Extraction failed: {str(e)[:200]}")
             raise
-        
+    
+    def lookup(self, url):
+        """Résultat en cache pour cette URL, ou None"""
+        cache_key = hashlib.md5(url.encode()).hexdigest()
+        started = time.perf_counter()
+        entry = url_cache.get_entry(cache_key)
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage="cache", site=sites.lookup(url).name)
+        CACHE_LOOKUPS.inc(result="hit" if entry else "miss")
+        if entry:
+            logger.info("Cache hit!")
+            cached, stored_at, expires_at = entry
+            # Servir l'entrée encore valide et la renouveler avant son expiration
+            if time.time() - stored_at >= (expires_at - stored_at) * CACHE_REFRESH_FRACTION:
+                self.refresh_async(url, cache_key)
+            cached["cached"] = True
+            return cached
         return None
     
-    def extract(self, url):
+    def extract(self, url, deadline=None, force=False):
         """Méthode principale d'extraction"""
         # Vérifier le cache
-        cache_key = hashlib.md5(url.encode()).hexdigest()
-        cached = url_cache.get(cache_key)
+        cached = self.lookup(url)
         if cached:
-            logger.info("Cache hit!")
-            cached["cached"] = True
             return cached
+        self.check_failures(url, force)
+        return self.extract_missed(url, deadline)
+    
+    def check_failures(self, url, force=False):
+        """Refuse immédiatement une URL ou un domaine en échec récent, sauf vérification forcée"""
+        domain = urlparse(url).hostname or ""
+        if force:
+            self.failures.forget(url, domain)
+            return
+        try:
+            self.failures.check(url, domain)
+        except ExtractionFailed as e:
+            NEGATIVE_CACHE_HITS.inc(scope=e.scope, reason=e.reason)
+            raise
+    
+    def extract_missed(self, url, deadline=None):
+        """Extraction après un défaut de cache"""
+        cache_key = hashlib.md5(url.encode()).hexdigest()
+        # Une seule extraction par URL, les requêtes simultanées l'attendent
+        return self.inflight.do(cache_key, self._extract_uncached, url, cache_key, False, deadline)
+    
+    def refresh_async(self, url, cache_key):
+        """Relance l'extraction en arrière-plan, une seule fois par URL"""
+        with self.refresh_lock:
+            if cache_key in self.refreshing:
+                return
+            self.refreshing.add(cache_key)
         
-        # Essayer d'abord sans proxy (plus rapide)
+        def refresh(fn, *args):
+            rescheduled = False
+            try:
+                fn(*args)
+                logger.info(f"Cache entry refreshed: {url}")
+            except Reschedule as r:
+                # Reprise plus tard dans le pool : le rafraîchissement reste en cours
+                r.wrap(refresh)
+                rescheduled = True
+                raise
+            except Exception as e:
+                logger.warning(f"Background refresh failed: {str(e)[:100]}")
+            finally:
+                if not rescheduled:
+                    with self.refresh_lock:
+                        self.refreshing.discard(cache_key)
+        
+        # Le rafraîchissement passe après les requêtes clientes si le pool est plein
+        domain = urlparse(url).hostname or ""
+        delay = self.reserve_slot(domain)
         try:
-            result = self.extract_simple(url, use_proxy=False)
-            if result:
-                url_cache.set(cache_key, result)
-                return result
-        except Exception as e:
-            logger.warning(f"First attempt failed: {str(e)[:100]}")
+            extraction_pool.submit(
+                self.prepaid, domain, refresh,
+                self.inflight.do, cache_key, self._extract_uncached, url, cache_key, True,
+                delay=delay
+            )
+        except PoolSaturated:
+            self.rate_limiter.refund(domain)
+            with self.refresh_lock:
+                self.refreshing.discard(cache_key)
+    
+    def cache_result(self, cache_key, result):
+        """Met en cache un résultat pour la durée de validité de son lien direct"""
+        ttl = ttl_for_stream(result.get("url"), CACHE_TTL)
+        if ttl > 0:
+            url_cache.set(cache_key, result, ttl)
+    
+    def check_deadline(self, deadline):
+        """Abandonne la chaîne de fallback une fois l'échéance du client dépassée"""
+        if deadline is not None and time.time() >= deadline:
+            raise TimeoutError("Extraction deadline exceeded")
+    
+    def _extract_uncached(self, url, cache_key, refresh=False, deadline=None):
+        """Chaîne direct -> proxy -> cobalt, exécutée par un seul appelant par URL"""
+        # Une extraction concurrente a pu se terminer entre-temps
+        if not refresh:
+            cached = url_cache.get(cache_key)
+            if cached:
+                cached["cached"] = True
+                return cached
         
-        # Si échec et proxies disponibles, réessayer avec proxy
+        chain = self.extract_hedged if HEDGED_EXTRACTION else self.extract_sequential
+        return self.finish_chain(url, cache_key, chain, url, deadline)
+    
+    def finish_chain(self, url, cache_key, fn, *args):
+        """Exécute la chaîne de fallback et enregistre son issue : cache ou cache négatif"""
+        domain = urlparse(url).hostname or ""
+        try:
+            result = fn(*args)
+        except Reschedule as r:
+            # Issue enregistrée à la reprise de la chaîne
+            r.wrap(self.finish_chain, url, cache_key)
+            raise
+        except ExtractionFailed as e:
+            e.retry_after = self.failures.record(url, domain, e.reason)
+            raise
+        self.failures.success(url, domain)
+        self.cache_result(cache_key, result)
+        return result
+    
+    def strategies(self, url, deadline=None):
+        """Stratégies d'extraction du site, la plus rapide à réussir d'abord"""
+        available = {
+            "direct": (self.extract_simple, (url, False, deadline)),
+            "cobalt": (self.extract_with_cobalt, (url,))
+        }
         if self.proxies_loaded and self.free_proxies:
+            available["proxy"] = (self.extract_simple, (url, True, deadline))
+        
+        site = sites.lookup(url)
+        return site, [(name, *available[name]) for name in sites.chain(site, available)]
+    
+    def timed(self, site, domain, strategy, fn, *args):
+        """Exécute une stratégie et enregistre son résultat et sa latence"""
+        started = time.monotonic()
+        try:
+            result = fn(*args)
+        except Exception:
+            elapsed = time.monotonic() - started
+            sites.record(site, strategy, False, elapsed)
+            STAGE_LATENCY.observe(elapsed, stage=STRATEGY_STAGES[strategy], site=site.name)
+            raise
+        elapsed = time.monotonic() - started
+        sites.record(site, strategy, bool(result), elapsed)
+        STAGE_LATENCY.observe(elapsed, stage=STRATEGY_STAGES[strategy], site=site.name)
+        if result:
+            self.latency.record(domain, strategy, elapsed)
+        return result
+    
+    def extract_sequential(self, url, deadline=None, start=0, errors=None, limited=0.0):
+        """Essaie chaque stratégie l'une après l'autre
+        
+        Dans le pool, une stratégie qui doit attendre son créneau de rate
+        limiting rend le thread (Reschedule) et la chaîne reprend à elle.
+        """
+        domain = urlparse(url).hostname or ""
+        site, chain = self.strategies(url, deadline)
+        errors = [] if errors is None else errors
+        for index in range(start, len(chain)):
+            strategy, fn, args = chain[index]
+            if index:
+                self.check_deadline(deadline)
+            # Le premier créneau est réservé avant d'entrer dans le pool ; hors du pool,
+            # rate_limit_check attend dans le thread de l'appelant
+            prepaid = getattr(self.prepaid_slot, "domain", None) == domain
+            if strategy in RATE_LIMITED_STRATEGIES and not prepaid and extraction_pool.resumable():
+                try:
+                    delay = self.reserve_before(domain, deadline)
+                except RateLimited as e:
+                    logger.info(f"{strategy} skipped: {e}")
+                    limited = max(limited, e.retry_after)
+                    continue
+                if delay > 0:
+                    raise Reschedule(delay, self.extract_sequential, url, deadline, index, errors, limited)
+                self.prepaid_slot.domain = domain
             try:
-                result = self.extract_simple(url, use_proxy=True)
+                result = self.timed(site, domain, strategy, fn, *args)
                 if result:
-                    url_cache.set(cache_key, result)
+                    with self.stats_lock:
+                        self.wins[strategy] += 1
                     return result
             except Exception as e:
-                logger.warning(f"Proxy attempt failed: {str(e)[:100]}")
+                logger.warning(f"{strategy} attempt failed: {str(e)[:100]}")
+                errors.append(str(e))
+        
+        if limited and not errors:
+            raise RateLimited(limited)
+        raise ExtractionFailed(classify(errors))
+    
+    def extract_hedged(self, url, deadline=None, start=0, errors=None, limited=0.0):
+        """Lance la stratégie suivante si la précédente dépasse sa latence habituelle
+        
+        Le premier résultat valide l'emporte, les autres tentatives sont annulées
+        ou leur résultat ignoré. Une stratégie limitée attend son créneau ici,
+        pendant que les autres tournent ; si plus rien ne tourne, le thread du
+        pool est rendu (Reschedule) jusqu'au créneau.
+        """
+        domain = urlparse(url).hostname or ""
+        site, chain = self.strategies(url, deadline)
+        if start:
+            self.check_deadline(deadline)
         
-        # Dernière tentative avec l'API externe
+        # Le créneau réservé avant le pool revient à la première stratégie limitée
+        prepaid = getattr(self.prepaid_slot, "domain", None) == domain
+        self.prepaid_slot.domain = None
+        
+        running = {}
+        errors = [] if errors is None else errors
+        next_index = start
+        launch_at = time.monotonic()
+        # Créneau réservé pour chain[next_index], utilisable à partir de slot_at
+        slot_at = None
         try:
-            result = self.extract_with_cobalt(url)
-            if result:
-                url_cache.set(cache_key, result)
-                return result
-        except Exception as e:
-            logger.warning(f"Cobalt API failed: {str(e)[:100]}")
+            while True:
+                now = time.monotonic()
+                if next_index < len(chain) and (now >= launch_at or not running):
+                    strategy, fn, args = chain[next_index]
+                    rate_limited = strategy in RATE_LIMITED_STRATEGIES
+                    if rate_limited and not prepaid and slot_at is None:
+                        try:
+                            slot_at = now + self.reserve_before(domain, deadline)
+                        except RateLimited as e:
+                            logger.info(f"{strategy} skipped: {e}")
+                            limited = max(limited, e.retry_after)
+                            next_index += 1
+                            continue
+                    
+                    if slot_at is None or slot_at <= now:
+                        if rate_limited:
+                            future = hedge_executor.submit(self.prepaid, domain, self.timed, site, domain, strategy, fn, *args)
+                            future.add_done_callback(lambda f: self.refund_cancelled(domain, f))
+                            prepaid = False
+                            slot_at = None
+                        else:
+                            future = hedge_executor.submit(self.timed, site, domain, strategy, fn, *args)
+                        if next_index:
+                            with self.stats_lock:
+                                self.hedges += 1
+                            logger.info(f"Hedging {domain} with {strategy}")
+                        running[future] = strategy
+                        launch_at = now + self.latency.hedge_delay(domain, strategy)
+                        next_index += 1
+                        continue
+                    
+                    if not running and extraction_pool.resumable():
+                        # La reprise consommera le créneau réservé
+                        delay = slot_at - now
+                        slot_at = None
+                        raise Reschedule(delay, self.extract_hedged, url, deadline, next_index, errors, limited)
+                
+                if not running and next_index >= len(chain):
+                    break
+                
+                timeout = None
+                if next_index < len(chain):
+                    timeout = (launch_at if slot_at is None else max(launch_at, slot_at)) - now
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError("Extraction deadline exceeded")
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    strategy = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"{strategy} attempt failed: {str(e)[:100]}")
+                        errors.append(str(e))
+                        result = None
+                    if result:
+                        with self.stats_lock:
+                            self.wins[strategy] += 1
+                        return result
+                    # Échec : inutile d'attendre pour lancer la suivante
+                    launch_at = time.monotonic()
+        finally:
+            for future in running:
+                future.cancel()
+            # Créneaux réservés mais jamais utilisés
+            for _ in range(prepaid + (slot_at is not None)):
+                self.rate_limiter.refund(domain)
         
-        raise Exception("All extraction methods failed")
+        if limited and not errors:
+            raise RateLimited(limited)
+        raise ExtractionFailed(classify(errors))
     
     def extract_with_cobalt(self, url):
         """Utilise l'API cobalt comme fallback"""
         try:
-            api_url = "https://co.wuk.sh/api/json"
+            api_url = COBALT_API_URL
             payload = {
                 "url": url,
                 "vQuality": "720",
@@ -242,7 +977,7 @@ class LightweightExtractor:
                 "isAudioOnly": False
             }
             
-            response = requests.post(
+            response = http_client.post(
                 api_url,
                 json=payload,
                 headers={
@@ -271,6 +1006,58 @@ class LightweightExtractor:
 # Instance globale
 extractor = LightweightExtractor()
 
+# Démarrage des tâches de fond, une fois par processus
+background_pid = None
+
+def start_background_tasks():
+    """Lance les threads de fond du worker : proxies, nettoyage du cache, préchauffage
+    
+    Avec preload_app, gunicorn l'appelle après le fork (post_fork) : les threads
+    démarrés dans le master ne survivraient pas au fork.
+    """
+    global background_pid
+    if background_pid == os.getpid():
+        return
+    background_pid = os.getpid()
+    
+    # Charger les proxies en arrière-plan après le démarrage
+    extractor.load_proxies_async()
+    url_cache.start_sweeper(int(os.environ.get("CACHE_SWEEP_INTERVAL", 60)))
+    metrics.start_flusher()
+    
+    warmup_urls = [u.strip() for u in os.environ.get("WARMUP_URLS", "").split(",") if u.strip()]
+    if warmup_urls:
+        Thread(target=warmup, args=(warmup_urls,), daemon=True).start()
+
+def warmup(urls):
+    """Extractions de préchauffage : remplit le cache et le pool YoutubeDL du worker"""
+    started = time.time()
+    for url in urls:
+        try:
+            future = extractor.submit(url, time.time() + EXTRACT_TIMEOUT)
+            extraction_pool.wait(future, timeout=EXTRACT_TIMEOUT)
+            logger.info(f"Warm-up extraction ready in {time.time() - started:.2f}s: {url}")
+        except Exception as e:
+            logger.warning(f"Warm-up extraction failed for {url}: {str(e)[:100]}")
+
+def preload():
+    """Charge dans le master tout ce que les workers partageront en copy-on-write"""
+    from yt_dlp.extractor import gen_extractor_classes
+    
+    started = time.time()
+    # Registre des extracteurs et modules réseau de yt-dlp
+    extractors = list(gen_extractor_classes())
+    yt_dlp.YoutubeDL({"quiet": True}).close()
+    # Exclure ces objets du GC pour que les workers ne touchent pas leurs pages
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded {len(extractors)} extractors in {time.time() - started:.2f}s")
+
+if os.environ.get("PRELOAD_APP") == "1":
+    preload()
+else:
+    start_background_tasks()
+
 # Routes Flask
 
 @app.route("/", methods=["GET"])
@@ -281,11 +1068,32 @@ def home():
         "status": "running",
         "uptime": time.time(),
         "cache_size": url_cache.size(),
+        "cache": url_cache.stats(),
         "proxies_ready": extractor.proxies_loaded,
         "proxy_count": len(extractor.free_proxies),
+        "coalescing": extractor.inflight.stats(),
+        "pool": extraction_pool.stats(),
+        "rate_limits": extractor.rate_limiter.stats(),
+        "failures": extractor.failures.stats(),
+        "hedging": {
+            "enabled": HEDGED_EXTRACTION,
+            "hedges": extractor.hedges,
+            "wins": dict(extractor.wins),
+            "latency": extractor.latency.stats()
+        },
+        "ydl_pool": ydl_pool.stats(),
+        "extraction_workers": extraction_workers.stats() if extraction_workers is not None else {"enabled": False},
+        "sites": sites.stats(),
+        "http": http_client.stats(),
+        "relay": relay.stats() if relay is not None else {"enabled": False},
+        "jobs": jobs.stats(),
         "endpoints": {
-            "extract": "/api/extract?url=VIDEO_URL",
+            "extract": "/api/extract?url=VIDEO_URL[&force=1]",
+            "batch": "/api/extract/batch (POST {\"urls\": [...], \"force\": false})",
+            "jobs": "/api/jobs (POST {\"url\": ..., \"force\": false}), /api/jobs/ID[?wait=SECONDS], /api/jobs/ID/events (SSE)",
             "health": "/health",
+            "metrics": "/metrics",
+            "relay": "/api/relay?t=TOKEN (relay_url of each result, RELAY_ENABLED=1)",
             "cache_clear": "/api/clear-cache"
         }
     }), 200
@@ -298,6 +1106,50 @@ def health():
         "timestamp": int(time.time())
     }), 200
 
+def is_valid_url(url):
+    """Validation basique de l'URL"""
+    try:
+        parsed = urlparse(url)
+        return bool(parsed.scheme and parsed.netloc)
+    except Exception:
+        return False
+
+def format_result(result):
+    """Données renvoyées au client pour une extraction réussie"""
+    data = {
+        "url": result["url"],
+        "type": "hls" if result.get("is_hls") else "mp4",
+        "title": result.get("title", "Video"),
+        "duration": result.get("duration"),
+        "thumbnail": result.get("thumbnail"),
+        "source": result.get("site"),
+        "cached": result.get("cached", False)
+    }
+    if relay is not None:
+        kind = "playlist" if result.get("is_hls") else "file"
+        data["relay_url"] = request.host_url.rstrip("/") + relay.url_for(result["url"], kind, result.get("site") or "")
+    return data
+
+def failure_details(error):
+    """Raison et délai avant nouvel essai d'un échec d'extraction"""
+    return {
+        "reason": error.reason,
+        "retry_after": error.retry_after,
+        "cached": error.cached
+    }
+
+def is_forced(value):
+    """Paramètre force de la requête : ignorer le cache négatif"""
+    return str(value).lower() in ("1", "true", "yes")
+
+def error_details(error):
+    """Message et code HTTP d'une extraction échouée, avec la raison si elle est connue"""
+    if isinstance(error, ExtractionFailed):
+        return {"error": str(error), "status": 500, **failure_details(error)}
+    if isinstance(error, TimeoutError):
+        return {"error": f"Extraction timeout ({EXTRACT_TIMEOUT}s exceeded)", "status": 408}
+    return {"error": str(error)[:500], "status": 500}
+
 @app.route("/api/extract", methods=["GET", "POST"])
 def api_extract():
     """Endpoint principal d'extraction"""
@@ -305,8 +1157,10 @@ def api_extract():
     if request.method == "POST":
         data = request.get_json()
         url = data.get("url") if data else None
+        force = is_forced(data.get("force")) if data else False
     else:
         url = request.args.get("url")
+        force = is_forced(request.args.get("force"))
     
     if not url:
         return jsonify({
@@ -315,34 +1169,21 @@ def api_extract():
         }), 400
     
     # Validation basique de l'URL
-    try:
-        parsed = urlparse(url)
-        if not parsed.scheme or not parsed.netloc:
-            raise ValueError("Invalid URL format")
-    except:
+    if not is_valid_url(url):
         return jsonify({
             "success": False,
             "error": "Invalid URL format"
         }), 400
     
     try:
-        # Extraction avec timeout
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(extractor.extract, url)
-            result = future.result(timeout=60)  # 60 secondes max
+        # Extraction dans le pool partagé, avec échéance réelle
+        future = extractor.submit(url, time.time() + EXTRACT_TIMEOUT, force)
+        result = extraction_pool.wait(future, timeout=EXTRACT_TIMEOUT)
         
         if result and result.get("success"):
             return jsonify({
                 "success": True,
-                "data": {
-                    "url": result["url"],
-                    "type": "hls" if result.get("is_hls") else "mp4",
-                    "title": result.get("title", "Video"),
-                    "duration": result.get("duration"),
-                    "thumbnail": result.get("thumbnail"),
-                    "source": result.get("site"),
-                    "cached": result.get("cached", False)
-                }
+                "data": format_result(result)
             }), 200
         else:
             return jsonify({
@@ -350,10 +1191,24 @@ def api_extract():
                 "error": "Failed to extract video URL"
             }), 500
             
+    except PoolSaturated as e:
+        return jsonify({
+            "success": False,
+            "error": "Server busy, retry later"
+        }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+    
+    except ExtractionFailed as e:
+        # Lien mort ou bloqué : le client sait quand réessayer
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            **failure_details(e)
+        }), 500, {"Retry-After": str(math.ceil(e.retry_after))}
+    
     except TimeoutError:
         return jsonify({
             "success": False,
-            "error": "Extraction timeout (60s exceeded)"
+            "error": f"Extraction timeout ({EXTRACT_TIMEOUT}s exceeded)"
         }), 408
     
     except Exception as e:
@@ -365,17 +1220,318 @@ def api_extract():
             "error": error_msg
         }), 500
 
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", 100))
+# Extractions simultanées par domaine au sein d'un même lot ; 0 : déduit de la limite
+# de débit du domaine et de sa latence observée (batch_domain_limit)
+BATCH_DOMAIN_CONCURRENCY = int(os.environ.get("BATCH_DOMAIN_CONCURRENCY", 0))
+# Latence supposée d'une extraction tant que le domaine n'a pas d'historique
+BATCH_ASSUMED_LATENCY = 2.0
+# Extractions simultanées d'un lot, tous domaines confondus : la moitié du pool
+# et de sa file reste aux requêtes unitaires
+BATCH_CONCURRENCY = int(os.environ.get(
+    "BATCH_CONCURRENCY",
+    max(1, (extraction_pool.workers + extraction_pool.max_queue) // 2)
+))
+
+def batch_domain_limit(domain):
+    """Extractions d'un lot lancées en même temps sur un domaine
+    
+    Le domaine ne peut pas servir plus de rafale + débit × latence extractions
+    à la fois (loi de Little) : au-delà, elles attendent leur créneau de rate
+    limiting en occupant une place du pool. En deçà, un lot de N URLs du même
+    hôte prendrait N / limite × latence au lieu de N / débit.
+    """
+    if BATCH_DOMAIN_CONCURRENCY > 0:
+        return BATCH_DOMAIN_CONCURRENCY
+    rate, burst = extractor.rate_limiter.limit_for(domain)
+    latency = extractor.latency.percentile(domain, "direct", 50) or BATCH_ASSUMED_LATENCY
+    return max(1, min(BATCH_CONCURRENCY, burst + math.ceil(rate * latency)))
+
+def batch_results(urls, force=False):
+    """Extrait un lot d'URLs en parallèle et produit chaque résultat dès qu'il est prêt"""
+    def line(index, url, result=None, error=None, status=500, details=None):
+        if result and result.get("success"):
+            item = {"index": index, "url": url, "success": True, "data": format_result(result)}
+        else:
+            item = {"index": index, "url": url, "success": False,
+                    "error": error or "Failed to extract video URL", "status": status}
+            item.update(details or {})
+        REQUESTS.inc(endpoint="batch_item", status=item.get("status", 200))
+        return json.dumps(item) + "\n"
+    
+    # URLs invalides et résultats en cache d'abord, sans attendre
+    queues = defaultdict(deque)
+    for index, url in enumerate(urls):
+        if not isinstance(url, str) or not is_valid_url(url):
+            yield line(index, url, error="Invalid URL format", status=400)
+            continue
+        cached = extractor.lookup(url)
+        if cached:
+            yield line(index, url, cached)
+        else:
+            queues[urlparse(url).hostname or ""].append((index, url))
+    
+    running = {}
+    active = defaultdict(int)
+    limits = {domain: batch_domain_limit(domain) for domain in queues}
+    started = time.time()
+    
+    while queues or running:
+        # Lancer autant d'extractions que les limites par domaine le permettent
+        saturated = False
+        for domain in list(queues):
+            queue = queues[domain]
+            while queue and active[domain] < limits[domain] and len(running) < BATCH_CONCURRENCY:
+                index, url = queue[0]
+                deadline = time.time() + EXTRACT_TIMEOUT
+                try:
+                    future = extractor.submit(url, deadline, force)
+                except RateLimited as e:
+                    # Attente plus longue que le timeout : inutile de garder l'URL dans le lot
+                    queue.popleft()
+                    yield line(index, url, error="Rate limited, retry later", status=503,
+                               details={"retry_after": round(e.retry_after, 1)})
+                    continue
+                except PoolSaturated:
+                    saturated = True
+                    break
+                queue.popleft()
+                active[domain] += 1
+                running[future] = (index, url, domain, deadline)
+            if not queue:
+                del queues[domain]
+            if saturated:
+                break
+        
+        if not running:
+            # Pool occupé par d'autres requêtes : patienter dans la limite du timeout
+            if time.time() - started > EXTRACT_TIMEOUT:
+                for queue in queues.values():
+                    for index, url in queue:
+                        yield line(index, url, error="Server busy, retry later", status=503)
+                return
+            time.sleep(0.2)
+            continue
+        
+        next_deadline = min(deadline for _, _, _, deadline in running.values())
+        done, _ = wait(running, timeout=max(0, next_deadline - time.time()), return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            index, url, domain, _ = running.pop(future)
+            active[domain] -= 1
+            try:
+                yield line(index, url, future.result())
+            except ExtractionFailed as e:
+                yield line(index, url, error=str(e), details=failure_details(e))
+            except TimeoutError:
+                yield line(index, url, error=f"Extraction timeout ({EXTRACT_TIMEOUT}s exceeded)", status=408)
+            except Exception as e:
+                yield line(index, url, error=str(e)[:500])
+        
+        now = time.time()
+        for future, (index, url, domain, deadline) in list(running.items()):
+            if now >= deadline:
+                future.cancel()
+                del running[future]
+                active[domain] -= 1
+                yield line(index, url, error=f"Extraction timeout ({EXTRACT_TIMEOUT}s exceeded)", status=408)
+
+@app.route("/api/extract/batch", methods=["POST"])
+def api_extract_batch():
+    """Extraction d'un lot d'URLs, résultats en NDJSON dans l'ordre de complétion"""
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
+    
+    if not isinstance(urls, list) or not urls:
+        return jsonify({
+            "success": False,
+            "error": "Missing 'urls' list"
+        }), 400
+    
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({
+            "success": False,
+            "error": f"Too many URLs (max {BATCH_MAX_URLS})"
+        }), 400
+    
+    return Response(
+        stream_with_context(batch_results(urls, is_forced(data.get("force")))),
+        mimetype="application/x-ndjson"
+    )
+
+def job_payload(job):
+    """Réponse d'un job : en attente, résultat formaté ou erreur"""
+    payload = {"job_id": job["id"], "url": job["url"], "status": job["status"]}
+    if job["status"] == "done":
+        result = job["result"]
+        if result and result.get("success"):
+            payload.update(success=True, data=format_result(result))
+        else:
+            payload.update(success=False, error="Failed to extract video URL", status_code=500)
+    elif job["status"] == "failed":
+        error = dict(job["error"])
+        payload.update(success=False, status_code=error.pop("status"), **error)
+    return payload
+
+def finish_job(job_id, future):
+    """Enregistre l'issue de l'extraction d'un job, appelé par le pool"""
+    if future.cancelled():
+        jobs.finish(job_id, error={"error": "Extraction cancelled", "status": 500})
+        return
+    error = future.exception()
+    if error is None:
+        jobs.finish(job_id, result=future.result())
+    else:
+        if not isinstance(error, (ExtractionFailed, TimeoutError)):
+            logger.error(f"Extraction failed for job {job_id}: {str(error)[:500]}")
+        jobs.finish(job_id, error=error_details(error))
+
+@app.route("/api/jobs", methods=["POST"])
+def api_create_job():
+    """Lance une extraction en arrière-plan et retourne l'identifiant du job
+
+    Un résultat déjà en cache (ou un échec en cache négatif) est renvoyé
+    directement, sans créer de job.
+    """
+    data = request.get_json(silent=True) or {}
+    url = data.get("url") or request.args.get("url")
+    force = is_forced(data.get("force", request.args.get("force")))
+    
+    if not url:
+        return jsonify({
+            "success": False,
+            "error": "Missing 'url' parameter"
+        }), 400
+    
+    if not is_valid_url(url):
+        return jsonify({
+            "success": False,
+            "error": "Invalid URL format"
+        }), 400
+    
+    deadline = time.time() + EXTRACT_TIMEOUT
+    try:
+        future = extractor.submit(url, deadline, force)
+    except PoolSaturated as e:
+        return jsonify({
+            "success": False,
+            "error": "Server busy, retry later"
+        }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+    
+    if future.done():
+        job = {"id": None, "url": url, "status": "done"}
+        error = future.exception()
+        if error is None:
+            job["result"] = future.result()
+        else:
+            job.update(status="failed", error=error_details(error))
+        payload = job_payload(job)
+        del payload["job_id"]
+        return jsonify(payload), 200 if payload["success"] else payload["status_code"]
+    
+    job_id = jobs.create(url, deadline)
+    future.add_done_callback(lambda f: finish_job(job_id, f))
+    location = f"/api/jobs/{job_id}"
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "pending",
+        "poll_url": location,
+        "events_url": f"{location}/events"
+    }), 202, {"Location": location}
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job(job_id):
+    """État d'un job ; avec ?wait=N, attend sa fin au plus N secondes"""
+    try:
+        wait_for = min(max(float(request.args.get("wait", 0)), 0), JOBS_MAX_WAIT)
+    except ValueError:
+        wait_for = 0
+    job = jobs.wait(job_id, wait_for) if wait_for else jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "error": "Unknown or expired job"
+        }), 404
+    
+    headers = {"Retry-After": "1"} if job["status"] == "pending" else {}
+    return jsonify(job_payload(job)), 200, headers
+
+def job_events(job_id):
+    """Flux SSE : état initial, commentaires de keepalive, puis l'événement final"""
+    job = jobs.get(job_id)
+    while job is not None:
+        if job["status"] != "pending":
+            yield f"event: {job['status']}\ndata: {json.dumps(job_payload(job))}\n\n"
+            return
+        yield f"event: pending\ndata: {json.dumps(job_payload(job))}\n\n"
+        job = jobs.wait(job_id, SSE_KEEPALIVE)
+        while job is not None and job["status"] == "pending":
+            yield ": keepalive\n\n"
+            job = jobs.wait(job_id, SSE_KEEPALIVE)
+    yield 'event: failed\ndata: {"success": false, "error": "Unknown or expired job"}\n\n'
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """Abonnement SSE à la fin d'un job (event: pending, puis done ou failed)"""
+    if jobs.get(job_id) is None:
+        return jsonify({
+            "success": False,
+            "error": "Unknown or expired job"
+        }), 404
+    
+    return Response(
+        stream_with_context(job_events(job_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/relay", methods=["GET"])
+def api_relay():
+    """Flux extrait servi par le service : playlist réécrite, segment en cache ou plage MP4"""
+    if relay is None:
+        return jsonify({"error": "Endpoint not found"}), 404
+    
+    try:
+        status, headers, body = relay.serve(request.args.get("t", ""), request.headers.get("Range"))
+    except RelayError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), e.status
+    
+    return Response(body, status=status, headers=headers)
+
 @app.route("/api/clear-cache", methods=["POST"])
 def clear_cache():
     """Vide le cache"""
     old_size = url_cache.size()
     url_cache.clear()
+    extractor.failures.clear()
     
     return jsonify({
         "success": True,
         "message": f"Cache cleared ({old_size} entries removed)"
     }), 200
 
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Compte les réponses et mesure la durée des endpoints d'extraction"""
+    endpoint = {"api_extract": "extract", "api_extract_batch": "batch", "api_create_job": "job"}.get(request.endpoint)
+    if endpoint and "started" in g:
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        REQUEST_LATENCY.observe(time.perf_counter() - g.started, endpoint=endpoint)
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Métriques au format texte Prometheus, tous workers confondus"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -394,4 +1550,5 @@ if __name__ == "__main__":
         logger.info(f"Running in production mode on port {port}")
     else:
         # Développement
+        start_background_tasks()
         app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,191 @@
+# sites.py
+import random
+from collections import deque
+from threading import Lock
+from urllib.parse import urlparse
+
+# Ordre par défaut des stratégies de fallback
+DEFAULT_CHAIN = ("direct", "proxy", "cobalt")
+
+class Site:
+    """Options yt-dlp, limite de débit et chaîne de fallback propres à un site
+
+    format, headers et ydl_opts sont ceux de l'extraction du serveur (et du
+    relais, qui rejoue ses headers) ; consumers garde, par consommateur
+    ("extractor"...), le format et les headers qui lui sont propres.
+    """
+
+    def __init__(self, name, hosts=(), format=None, headers=None, ydl_opts=None, chain=DEFAULT_CHAIN, labels=(),
+                 rate_limit=None, consumers=None):
+        self.name = name
+        self.hosts = tuple(hosts)
+        # Labels d'hôte reconnus sur n'importe quel domaine (miroirs : vidmoly.*)
+        self.labels = tuple(labels)
+        self.format = format
+        # "{host}" est remplacé par l'hôte de l'URL extraite
+        self.headers = headers or {}
+        self.ydl_opts = ydl_opts or {}
+        self.chain = tuple(chain)
+        # (requêtes par seconde, rafale), None : limite par défaut du rate limiter
+        self.rate_limit = rate_limit
+        # {consommateur: {"format", "headers", "ydl_opts"}} appliqués après ceux du site
+        self.consumers = consumers or {}
+
+    def options(self, base_opts, host="", consumer=None):
+        """Options yt-dlp de base complétées par celles du site, puis du consommateur"""
+        ydl_opts = dict(base_opts)
+        profiles = [(self.format, self.headers, self.ydl_opts)]
+        override = self.consumers.get(consumer)
+        if override:
+            profiles.append((override.get("format"), override.get("headers"), override.get("ydl_opts")))
+        for format, headers, extra in profiles:
+            ydl_opts.update(extra or {})
+            if format:
+                ydl_opts["format"] = format
+            if headers:
+                merged = dict(ydl_opts.get("http_headers") or {})
+                merged.update({k: v.format(host=host) for k, v in headers.items()})
+                ydl_opts["http_headers"] = merged
+        return ydl_opts
+
+class StrategyStats:
+    """Résultats récents d'une stratégie sur un site"""
+
+    def __init__(self, window=50):
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, ok, seconds):
+        self.outcomes.append((ok, seconds))
+
+    def summary(self):
+        attempts = len(self.outcomes)
+        successes = [seconds for ok, seconds in self.outcomes if ok]
+        return {
+            "attempts": attempts,
+            "success_rate": len(successes) / attempts if attempts else 0.0,
+            "latency": sum(successes) / len(successes) if successes else None
+        }
+
+class SiteRegistry:
+    """Sites indexés par suffixe d'hôte, avec ordre des stratégies adaptatif"""
+
+    def __init__(self, default, min_samples=10, explore_rate=0.05):
+        self.default = default
+        self.by_host = {}
+        self.by_label = {}
+        self.sites = {default.name: default}
+        self.outcomes = {}
+        self.min_samples = min_samples
+        self.explore_rate = explore_rate
+        self.lock = Lock()
+
+    def register(self, site):
+        self.sites[site.name] = site
+        for host in site.hosts:
+            self.by_host[host] = site
+        for label in site.labels:
+            self.by_label[label] = site
+        return site
+
+    def lookup(self, url_or_host):
+        """Site du suffixe d'hôte le plus spécifique : une recherche par label, pas de scan"""
+        host = url_or_host
+        if "/" in host:
+            host = urlparse(host).hostname or ""
+        labels = host.lower().split(".")
+        for i in range(len(labels) - 1):
+            site = self.by_host.get(".".join(labels[i:]))
+            if site is not None:
+                return site
+        # Miroirs sur un domaine non listé, reconnus par un label de l'hôte
+        for label in labels[:-1]:
+            site = self.by_label.get(label)
+            if site is not None:
+                return site
+        return self.default
+
+    def record(self, site, strategy, ok, seconds):
+        with self.lock:
+            stats = self.outcomes.get((site.name, strategy))
+            if stats is None:
+                stats = self.outcomes[(site.name, strategy)] = StrategyStats()
+            stats.record(ok, seconds)
+
+    def score(self, site, strategy):
+        """Temps moyen attendu avant un succès, None sans historique suffisant"""
+        with self.lock:
+            stats = self.outcomes.get((site.name, strategy))
+            summary = stats.summary() if stats else None
+        if not summary or summary["attempts"] < self.min_samples:
+            return None
+        if not summary["success_rate"]:
+            return float("inf")
+        return summary["latency"] / summary["success_rate"]
+
+    def chain(self, site, available=None):
+        """Stratégies du site, la plus rapide à réussir d'abord
+
+        Les stratégies sans historique gardent leur rang déclaré ; un petit
+        pourcentage d'appels suit l'ordre déclaré pour continuer à mesurer
+        les autres.
+        """
+        chain = [s for s in site.chain if available is None or s in available]
+        if random.random() < self.explore_rate:
+            return chain
+
+        scores = {strategy: self.score(site, strategy) for strategy in chain}
+        measured = sorted((s for s in chain if scores[s] is not None), key=lambda s: scores[s])
+        # Réinsérer les stratégies mesurées, triées, aux places qu'elles occupaient
+        ordered = iter(measured)
+        return [next(ordered) if scores[s] is not None else s for s in chain]
+
+    def stats(self):
+        with self.lock:
+            items = [(key, stats.summary()) for key, stats in self.outcomes.items()]
+        result = {}
+        for (name, strategy), summary in items:
+            result.setdefault(name, {})[strategy] = summary
+        return result
+
+registry = SiteRegistry(Site("generic"))
+
+registry.register(Site(
+    "youtube",
+    hosts=("youtube.com", "youtu.be"),
+    format="best[height<=720]/best",
+    rate_limit=(5.0, 10)
+))
+registry.register(Site(
+    "sibnet",
+    hosts=("sibnet.ru",),
+    headers={"Referer": "https://video.sibnet.ru/"},
+    rate_limit=(0.5, 1),
+    consumers={"extractor": {
+        "format": "mp4/best",
+        "headers": {"Origin": "https://video.sibnet.ru"},
+        "ydl_opts": {"socket_timeout": 30}
+    }}
+))
+registry.register(Site(
+    "vk",
+    hosts=("vk.com",),
+    rate_limit=(1.0, 2),
+    consumers={"extractor": {
+        # Limite la qualité
+        "format": "best[height<=720]",
+        "headers": {"User-Agent": "Mozilla/5.0 (compatible; VK App)", "Referer": "https://vk.com/"}
+    }}
+))
+registry.register(Site(
+    "vidmoly",
+    hosts=("vidmoly.net", "vidmoly.to", "vidmoly.me"),
+    labels=("vidmoly",),
+    headers={"Referer": "https://{host}/"},
+    rate_limit=(0.5, 1),
+    consumers={"extractor": {"format": "mp4/best", "headers": {"Accept": "*/*"}}}
+))
+registry.register(Site(
+    "myvi",
+    hosts=("myvi.top", "myvi.tv"),
+    consumers={"extractor": {"format": "mp4/best", "headers": {"Referer": "https://{host}/", "Accept": "*/*"}}}
+))
@@ -0,0 +1,99 @@
+# ydl_pool.py
+import json
+import logging
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+
+import yt_dlp
+from yt_dlp.utils import DownloadError
+from yt_dlp.utils.networking import HTTPHeaderDict, std_headers
+
+logger = logging.getLogger(__name__)
+
+class YoutubeDLPool:
+    """Instances YoutubeDL réutilisables, regroupées par profil d'options
+
+    Un profil correspond à toutes les options sauf les headers, qui sont
+    appliqués à chaque emprunt sans reconstruire l'instance.
+    """
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.idle = defaultdict(list)
+        self.lock = Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    @staticmethod
+    def profile_key(ydl_opts):
+        options = {k: v for k, v in ydl_opts.items() if k != "http_headers"}
+        return json.dumps(options, sort_keys=True, default=repr)
+
+    @contextmanager
+    def checkout(self, ydl_opts):
+        """Emprunte une instance pour ce profil, la rend au pool après usage"""
+        key = self.profile_key(ydl_opts)
+
+        ydl = None
+        with self.lock:
+            if self.idle[key]:
+                ydl = self.idle[key].pop()
+                self.reused += 1
+            else:
+                self.created += 1
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(dict(ydl_opts))
+        else:
+            # Même traitement que YoutubeDL.__init__ pour les headers de la requête
+            ydl.params["http_headers"] = HTTPHeaderDict(std_headers, ydl_opts.get("http_headers"))
+
+        try:
+            yield ydl
+        except DownloadError:
+            # Échec d'extraction ordinaire, l'instance reste utilisable
+            self.release(key, ydl)
+            raise
+        except BaseException:
+            self.discard(ydl)
+            raise
+        else:
+            self.release(key, ydl)
+
+    def release(self, key, ydl):
+        with self.lock:
+            if len(self.idle[key]) < self.max_idle:
+                self.idle[key].append(ydl)
+                return
+            self.discarded += 1
+        ydl.close()
+
+    def discard(self, ydl):
+        with self.lock:
+            self.discarded += 1
+        try:
+            ydl.close()
+        except Exception as e:
+            logger.warning(f"Failed to close YoutubeDL: {e}")
+
+    def clear(self):
+        with self.lock:
+            instances = [ydl for idle in self.idle.values() for ydl in idle]
+            self.idle.clear()
+        for ydl in instances:
+            ydl.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "profiles": sum(1 for idle in self.idle.values() if idle),
+                "idle": sum(len(idle) for idle in self.idle.values()),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded
+            }
+
+# Pool partagé par server.py et extractor.py
+ydl_pool = YoutubeDLPool(max_idle=int(os.environ.get("YDL_POOL_IDLE", 4)))